@@ -1,12 +1,25 @@
 // Background service worker for SideClip
 console.log('%c[SideClip Background] Service worker loaded at ' + new Date().toLocaleTimeString(), 'color: #28a745; font-weight: bold;');
 
-// Import image database utility
-importScripts('imageDB.js');
+// Import image database, fetcher, metadata and text compression utilities
+importScripts('imageDB.js', 'imageFetcher.js', 'imageMetadata.js', 'textCodec.js');
+
+// Largest image accepted into history
+const MAX_IMAGE_SIZE = 5 * 1024 * 1024; // 5MB
+
+// Texts longer than this are stored compressed in IndexedDB
+const TEXT_COMPRESSION_THRESHOLD = 4 * 1024; // characters
+const TEXT_HASH_PREFIX = 'sha256:';
 
 // Initialize image database
 let imageDB = null;
 
+// Shared fetcher for context menu image downloads
+const imageFetcher = new ImageFetcher({ maxBytes: MAX_IMAGE_SIZE });
+
+// History read-modify-writes run one at a time so concurrent captures don't overwrite each other
+let historyUpdateChain = Promise.resolve();
+
 // Enhanced logging function
 function logBackground(message, data = null) {
   const timestamp = new Date().toLocaleTimeString();
@@ -17,6 +30,13 @@ function logBackground(message, data = null) {
   }
 }
 
+// Queue an update of clipboardHistory behind the ones already running
+function runHistoryUpdate(update) {
+  const run = historyUpdateChain.then(update);
+  historyUpdateChain = run.catch(() => {});
+  return run;
+}
+
 // Initialize image database
 async function initImageDB() {
   if (!imageDB) {
@@ -64,6 +84,7 @@ chrome.runtime.onInstalled.addListener(async () => {
   
   // Initialize image database
   await initImageDB();
+  await cleanOrphanedTexts();
   
   // Set default side panel behavior
   chrome.sidePanel.setPanelBehavior({ openPanelOnActionClick: true }).catch((error) => {
@@ -160,20 +181,8 @@ chrome.runtime.onMessage.addListener(async (message, sender, sendResponse) => {
     await handleTextCopied(message.text);
     sendResponse({ success: true });
   } else if (message.type === 'IMAGE_COPIED') {
-    // Convert data URL to blob
     try {
-      const response = await fetch(message.imageData);
-      const blob = await response.blob();
-      
-      const imageData = {
-        blob: blob,
-        size: blob.size,
-        type: message.mimeType || blob.type,
-        url: sender.tab?.url || '',
-        dataUrl: message.imageData
-      };
-      
-      await handleImageCopied(imageData, sender.tab);
+      await handleImageDataUrl(message.imageData, message.mimeType, sender.tab);
       sendResponse({ success: true });
     } catch (error) {
       console.error('Error processing image data:', error);
@@ -195,6 +204,98 @@ chrome.runtime.onMessage.addListener(async (message, sender, sendResponse) => {
   return true; // Keep message channel open for async response
 });
 
+// Batched captures from content scripts arrive over a long-lived port.
+// Content scripts keep one batch in flight and wait for the ack before sending more.
+const CAPTURE_PORT_NAME = 'sideclip-capture';
+const MAX_REMEMBERED_BATCHES = 20;
+
+// Recently applied batches per tab. A content script resends its batch when the
+// port drops before the ack, so a batch seen again is acked without reapplying it.
+const appliedCaptureBatches = new Map(); // tabId -> { sessionId, batches: Map(batchId -> promise) }
+
+chrome.runtime.onConnect.addListener((port) => {
+  if (port.name !== CAPTURE_PORT_NAME) return;
+
+  port.onMessage.addListener(async (message) => {
+    if (message.type !== 'CAPTURE_BATCH') return;
+
+    await applyCaptureBatchOnce(message, port.sender?.tab);
+
+    try {
+      port.postMessage({ type: 'CAPTURE_ACK', batchId: message.batchId });
+    } catch (error) {
+      // The tab navigated away or closed before the ack
+      console.log('Capture ack not delivered:', error.message);
+    }
+  });
+});
+
+chrome.tabs.onRemoved.addListener((tabId) => {
+  appliedCaptureBatches.delete(tabId);
+});
+
+// Apply a batch unless the same tab and page session already sent it
+function applyCaptureBatchOnce(message, tab) {
+  const tabId = tab?.id ?? -1;
+  let tabBatches = appliedCaptureBatches.get(tabId);
+  if (!tabBatches || tabBatches.sessionId !== message.sessionId) {
+    tabBatches = { sessionId: message.sessionId, batches: new Map() };
+    appliedCaptureBatches.set(tabId, tabBatches);
+  }
+
+  if (tabBatches.batches.has(message.batchId)) {
+    console.log('Duplicate capture batch, acking without reapplying:', message.batchId);
+    return tabBatches.batches.get(message.batchId);
+  }
+
+  const applied = handleCaptureBatch(message.entries || [], tab);
+  tabBatches.batches.set(message.batchId, applied);
+
+  while (tabBatches.batches.size > MAX_REMEMBERED_BATCHES) {
+    const oldestBatchId = tabBatches.batches.keys().next().value;
+    tabBatches.batches.delete(oldestBatchId);
+  }
+
+  return applied;
+}
+
+// Apply a batch of captures in order, writing consecutive texts in one update
+async function handleCaptureBatch(entries, tab) {
+  let pendingTexts = [];
+
+  for (const entry of entries) {
+    if (entry.type === 'TEXT_COPIED') {
+      pendingTexts.push(entry.text);
+    } else if (entry.type === 'IMAGE_COPIED') {
+      await handleTextsCopied(pendingTexts);
+      pendingTexts = [];
+      try {
+        await handleImageDataUrl(entry.imageData, entry.mimeType, tab);
+      } catch (error) {
+        console.error('Error processing image data:', error);
+      }
+    }
+  }
+
+  await handleTextsCopied(pendingTexts);
+}
+
+// Convert an image data URL from a content script into a stored image
+async function handleImageDataUrl(dataUrl, mimeType, tab) {
+  const response = await fetch(dataUrl);
+  const blob = await response.blob();
+
+  const imageData = {
+    blob: blob,
+    size: blob.size,
+    type: mimeType || blob.type,
+    url: tab?.url || '',
+    dataUrl: dataUrl
+  };
+
+  await handleImageCopied(imageData, tab);
+}
+
 // Handle context menu clicks
 chrome.contextMenus.onClicked.addListener(async (info, tab) => {
 
@@ -209,7 +310,10 @@ chrome.contextMenus.onClicked.addListener(async (info, tab) => {
       const imageData = await downloadImageInBackground(info.srcUrl);
       
       if (imageData.success) {
-        await handleImageCopied(imageData, tab);
+        const imageId = await handleImageCopied(imageData, tab);
+        if (!imageData.isPlaceholder) {
+          imageFetcher.rememberImage(info.srcUrl, imageId);
+        }
         
         // Show success badge
         chrome.action.setBadgeText({ text: '✓' });
@@ -245,47 +349,29 @@ async function downloadImageInBackground(imageUrl) {
   
     logBackground('Starting image download:', imageUrl);
     
-    // Use fetch with proper headers
-    const response = await fetch(imageUrl, {
-      method: 'GET',
-      headers: {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-      }
-    });
-    
-    if (!response.ok) {
-      throw new Error(`HTTP error! status: ${response.status}`);
-    }
-    
-    const blob = await response.blob();
+    // Reuse the stored blob if this URL was fetched recently
+    const download = await getRecentlyFetchedImage(imageUrl) || await imageFetcher.fetch(imageUrl);
+    const dataUrl = await readBlobAsDataUrl(download.blob);
+    
+    // Dimensions are read from the image header in handleImageCopied
+    return {
+      success: true,
+      blob: download.blob,
+      size: download.size,
+      type: download.type,
+      url: imageUrl,
+      dataUrl: dataUrl
+    };
     
-    // Convert blob to data URL
-    const reader = new FileReader();
-    return new Promise((resolve) => {
-      reader.onload = function() {
-        // Service Worker cannot use Image constructor
-        // We'll get dimensions later when the image is displayed
-        resolve({
-          success: true,
-          blob: blob,
-          size: blob.size,
-          type: blob.type,
-          url: imageUrl,
-          dataUrl: reader.result,
-          width: 0, // Will be determined in UI
-          height: 0 // Will be determined in UI
-        });
-      };
-      reader.onerror = function() {
-        resolve({
-          success: false,
-          error: 'Failed to read blob as data URL'
-        });
+  } catch (error) {
+    if (error.tooLarge) {
+      console.warn('Image too large, skipping:', imageUrl);
+      return {
+        success: false,
+        error: error.message
       };
-      reader.readAsDataURL(blob);
-    });
+    }
     
-  } catch (error) {
     console.error('Error downloading image:', error);
     
     // Create placeholder image as fallback
@@ -308,75 +394,222 @@ async function downloadImageInBackground(imageUrl) {
     
     const blob = await canvas.convertToBlob({ type: 'image/png' });
     
-    const reader = new FileReader();
-    return new Promise((resolve) => {
-      reader.onload = function() {
-        resolve({
-          success: true,
-          blob: blob,
-          size: blob.size,
-          type: blob.type,
-          url: imageUrl,
-          dataUrl: reader.result,
-          isPlaceholder: true
-        });
-      };
-      reader.readAsDataURL(blob);
-    });
+    return {
+      success: true,
+      blob: blob,
+      size: blob.size,
+      type: blob.type,
+      url: imageUrl,
+      dataUrl: await readBlobAsDataUrl(blob),
+      isPlaceholder: true
+    };
+  }
+}
+
+// Load a recently downloaded image from IndexedDB instead of fetching it again
+async function getRecentlyFetchedImage(imageUrl) {
+  const imageId = imageFetcher.getRecentImageId(imageUrl);
+  if (!imageId) return null;
+
+  try {
+    await initImageDB();
+    const record = await imageDB.getImage(imageId);
+    if (!record) {
+      imageFetcher.forgetImage(imageId);
+      return null;
+    }
+
+    logBackground('Reusing recently fetched image:', imageId);
+    return {
+      blob: record.blob,
+      size: record.size,
+      type: record.type,
+      url: imageUrl
+    };
+  } catch (error) {
+    console.error('Error reading recently fetched image:', error);
+    return null;
   }
 }
 
+// Read a blob as a data URL
+function readBlobAsDataUrl(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(new Error('Failed to read blob as data URL'));
+    reader.readAsDataURL(blob);
+  });
+}
+
 // Handle text copied from content script
 async function handleTextCopied(text) {
+  await handleTextsCopied([text]);
+}
+
+// Add copied texts (oldest first) to history with a single read-modify-write
+async function handleTextsCopied(texts) {
+  await runHistoryUpdate(() => addTextsToHistory(texts));
+}
+
+async function addTextsToHistory(texts) {
   try {
-    console.log('handleTextCopied called with:', text);
-    
     // Don't store empty text
-    if (!text || text.trim().length === 0) {
-      console.log('Empty text, skipping...');
+    texts = texts.filter(text => text && text.trim().length > 0);
+    if (texts.length === 0) {
       return;
     }
-    
+
+    console.log('handleTextsCopied called with:', texts.length + ' items');
+
+    // Large texts are compared by hash since their history items don't keep the text
+    const keys = await Promise.all(texts.map(getTextKey));
+
     // Get current clipboard history
     const result = await chrome.storage.local.get(['clipboardHistory']);
     let history = result.clipboardHistory || [];
-    
-    console.log('Current history length:', history.length);
-    
-    // Remove duplicate if exists (to avoid duplicates when moving to top)
-    history = history.filter(item => item.text !== text);
-    
-    // Add new item to the beginning with timestamp
-    const newItem = {
-      id: Date.now().toString(),
-      type: 'text',
-      text: text,
-      timestamp: new Date().toISOString(),
-      preview: text.length > 100 ? text.substring(0, 100) + '...' : text
-    };
-    
-    history.unshift(newItem);
-    
+
+    const historyKeys = await Promise.all(history.map(getItemTextKey));
+
+    // Copying the item that is already on top changes nothing; skip the write
+    const latestKey = keys[keys.length - 1];
+    if (keys.every(key => key === latestKey) && historyKeys[0] === latestKey) {
+      console.log('Unchanged repeat, skipping...');
+      return;
+    }
+
+    // Remove duplicates if they exist (to avoid duplicates when moving to top)
+    const copiedKeys = new Set(keys);
+    const replacedItems = new Map();
+    history = history.filter((item, index) => {
+      const key = historyKeys[index];
+      if (key && copiedKeys.has(key)) {
+        replacedItems.set(key, item);
+        return false;
+      }
+      return true;
+    });
+
+    const now = Date.now();
+    const timestamp = new Date(now).toISOString();
+    const newItems = [];
+    const added = new Set();
+
+    // Most recent copy goes first; a text copied twice in one batch is added once
+    for (let i = texts.length - 1; i >= 0; i--) {
+      const text = texts[i];
+      const key = keys[i];
+      if (added.has(key)) continue;
+      added.add(key);
+
+      const newItem = {
+        id: texts.length === 1 ? now.toString() : `${now}-${i}`,
+        type: 'text',
+        timestamp: timestamp,
+        preview: text.length > 100 ? text.substring(0, 100) + '...' : text
+      };
+
+      if (text.length > TEXT_COMPRESSION_THRESHOLD) {
+        // Keep only the preview in storage; reuse the stored copy of a repeated text
+        const replaced = replacedItems.get(key);
+        newItem.compressed = true;
+        newItem.textId = replaced?.compressed ? replaced.textId : await storeCompressedText(text);
+        newItem.textHash = key.substring(TEXT_HASH_PREFIX.length);
+        newItem.textLength = text.length;
+      } else {
+        newItem.text = text;
+      }
+
+      newItems.push(newItem);
+    }
+
+    // Add new items to the beginning
+    history = newItems.concat(history);
+
     // Limit history to 50 items for performance
+    const removedItems = Array.from(replacedItems.values());
     if (history.length > 50) {
+      removedItems.push(...history.slice(50));
       history = history.slice(0, 50);
     }
-    
+
     // Save updated history
     await chrome.storage.local.set({ clipboardHistory: history });
-    
-    console.log('Text added to clipboard history:', newItem.preview);
+    await deleteOrphanedTexts(removedItems, history);
+
+    console.log('Texts added to clipboard history:', newItems.length);
     console.log('New history length:', history.length);
-    
-    // Verify the data was saved
-    const verification = await chrome.storage.local.get(['clipboardHistory']);
-    console.log('Verification - items in storage:', verification.clipboardHistory?.length || 0);
-    
+
   } catch (error) {
     console.error('Error handling copied text:', error);
   }
 }
 
+// Identify a text for duplicate detection
+async function getTextKey(text) {
+  if (text.length > TEXT_COMPRESSION_THRESHOLD) {
+    return TEXT_HASH_PREFIX + await hashText(text);
+  }
+  return text;
+}
+
+// Items stored before compression existed keep large texts inline; key them by hash too
+async function getItemTextKey(item) {
+  if (!item || item.type !== 'text') return null;
+  if (item.compressed) return TEXT_HASH_PREFIX + item.textHash;
+  return item.text ? getTextKey(item.text) : null;
+}
+
+// Compress a large text into IndexedDB and return its ID
+async function storeCompressedText(text) {
+  // Separate from the history item ID, which two same-millisecond captures can share
+  const id = `${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
+  await initImageDB();
+  const data = await compressText(text);
+  await imageDB.storeText({ id: id, data: data, length: text.length });
+  logBackground('Compressed text stored:', `${text.length} chars -> ${data.size} bytes`);
+  return id;
+}
+
+// Delete stored texts that no remaining history item refers to
+async function deleteOrphanedTexts(removedItems, history) {
+  try {
+    const keptIds = new Set(history.filter(item => item.compressed).map(item => item.textId));
+    const orphanedIds = removedItems
+      .filter(item => item.compressed && !keptIds.has(item.textId))
+      .map(item => item.textId);
+
+    if (orphanedIds.length > 0) {
+      await initImageDB();
+      await imageDB.deleteTexts(orphanedIds);
+    }
+  } catch (error) {
+    console.error('Error deleting orphaned texts:', error);
+  }
+}
+
+// Delete every stored text that no history item refers to. Catches records
+// left behind when a history write failed after the text was stored.
+async function cleanOrphanedTexts() {
+  await runHistoryUpdate(async () => {
+    try {
+      await initImageDB();
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      const keptIds = new Set((result.clipboardHistory || [])
+        .filter(item => item.compressed)
+        .map(item => item.textId));
+      const orphanedIds = (await imageDB.getAllTextIds()).filter(id => !keptIds.has(id));
+
+      if (orphanedIds.length > 0) {
+        await imageDB.deleteTexts(orphanedIds);
+        console.log(`Cleaned ${orphanedIds.length} orphaned texts`);
+      }
+    } catch (error) {
+      console.error('Error cleaning orphaned texts:', error);
+    }
+  });
+}
+
 // Handle image copied
 async function handleImageCopied(imageData, tab) {
   try {
@@ -386,12 +619,24 @@ async function handleImageCopied(imageData, tab) {
     }
 
     // Check image size (limit to 5MB)
-    const maxSize = 5 * 1024 * 1024; // 5MB
-    if (imageData.size > maxSize) {
+    if (imageData.size > MAX_IMAGE_SIZE) {
       console.warn('Image too large, skipping:', imageData.size);
       return;
     }
 
+    // Read dimensions from the header so the UI never has to decode for them
+    let metadata = null;
+    try {
+      metadata = await readImageMetadata(imageData.blob);
+    } catch (metadataError) {
+      console.error('Failed to read image metadata:', metadataError);
+    }
+
+    const imageType = metadata?.mimeType || imageData.type;
+    const width = metadata?.width || 0;
+    const height = metadata?.height || 0;
+    const animated = metadata?.animated || false;
+
     // Initialize image database if needed
     await initImageDB();
 
@@ -402,7 +647,10 @@ async function handleImageCopied(imageData, tab) {
         blob: imageData.blob,
         url: imageData.url || tab?.url || '',
         size: imageData.size,
-        type: imageData.type
+        type: imageType,
+        width: width,
+        height: height,
+        animated: animated
       });
       console.log('Image successfully stored in IndexedDB:', imageRecord.id);
     } catch (dbError) {
@@ -419,10 +667,6 @@ async function handleImageCopied(imageData, tab) {
       logBackground('IndexedDB storage failed, continuing without database storage');
     }
 
-    // Add to text history for unified timeline (continue even if DB storage failed)
-    const result = await chrome.storage.local.get(['clipboardHistory']);
-    let history = result.clipboardHistory || [];
-    
     // Create fallback record if IndexedDB storage failed
     const recordId = imageRecord?.id || `fallback-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
     const recordTimestamp = imageRecord?.timestamp || new Date().toISOString();
@@ -437,27 +681,67 @@ async function handleImageCopied(imageData, tab) {
       dataUrl: imageData.dataUrl,
       size: formatFileSize(imageData.size),
       originalSize: imageData.size,
-      width: imageData.width || 'Unknown',
-      height: imageData.height || 'Unknown'
+      mimeType: imageType,
+      width: width,
+      height: height,
+      animated: animated
     };
     
     logBackground('Created image item:', newItem);
     
-    history.unshift(newItem);
+    // Add to text history for unified timeline (continue even if DB storage failed)
+    await runHistoryUpdate(async () => {
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      let history = result.clipboardHistory || [];
+      
+      history.unshift(newItem);
+      
+      // Limit history to 50 items for performance
+      let removedItems = [];
+      if (history.length > 50) {
+        removedItems = history.slice(50);
+        history = history.slice(0, 50);
+      }
+      
+      await chrome.storage.local.set({ clipboardHistory: history });
+      await deleteOrphanedTexts(removedItems, history);
+    });
     
-    // Limit history to 50 items for performance
-    if (history.length > 50) {
-      history = history.slice(0, 50);
+    // Pre-encode a PNG once so pasting from the side panel needs no re-encode
+    if (imageRecord && imageType !== 'image/png') {
+      await storeClipboardPng(imageRecord.id, imageData.blob);
     }
     
-    await chrome.storage.local.set({ clipboardHistory: history });
-    
     // Clean old images if needed
     await imageDB.cleanOldImages(50);
+    await cleanOrphanedTexts();
     
-    console.log('Image added to clipboard history:', imageRecord.id);
+    console.log('Image added to clipboard history:', recordId);
+    return imageRecord?.id || null;
   } catch (error) {
     console.error('Error handling copied image:', error);
+    return null;
+  }
+}
+
+// Convert a stored image to PNG off the UI thread and keep it next to the original
+async function storeClipboardPng(imageId, blob) {
+  try {
+    const bitmap = await createImageBitmap(blob);
+    let pngBlob;
+    try {
+      const canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+      canvas.getContext('2d').drawImage(bitmap, 0, 0);
+      pngBlob = await canvas.convertToBlob({ type: 'image/png' });
+    } finally {
+      bitmap.close();
+    }
+    
+    await imageDB.storeClipboardBlob(imageId, pngBlob);
+    logBackground('Clipboard PNG stored:', imageId);
+  } catch (error) {
+    // The side panel falls back to converting on paste
+    console.error('Error creating clipboard PNG:', error);
   }
 }
 
@@ -507,12 +791,15 @@ async function deleteImage(imageId) {
   try {
     await initImageDB();
     await imageDB.deleteImage(imageId);
+    imageFetcher.forgetImage(imageId);
     
     // Also remove from text history
-    const result = await chrome.storage.local.get(['clipboardHistory']);
-    let history = result.clipboardHistory || [];
-    history = history.filter(item => item.id !== imageId);
-    await chrome.storage.local.set({ clipboardHistory: history });
+    await runHistoryUpdate(async () => {
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      let history = result.clipboardHistory || [];
+      history = history.filter(item => item.id !== imageId);
+      await chrome.storage.local.set({ clipboardHistory: history });
+    });
     
     console.log('Image deleted:', imageId);
   } catch (error) {
@@ -525,12 +812,15 @@ async function clearAllImages() {
   try {
     await initImageDB();
     await imageDB.clearAllImages();
+    imageFetcher.clearRecentImages();
     
     // Also clear from text history
-    const result = await chrome.storage.local.get(['clipboardHistory']);
-    let history = result.clipboardHistory || [];
-    history = history.filter(item => item.type !== 'image');
-    await chrome.storage.local.set({ clipboardHistory: history });
+    await runHistoryUpdate(async () => {
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      let history = result.clipboardHistory || [];
+      history = history.filter(item => item.type !== 'image');
+      await chrome.storage.local.set({ clipboardHistory: history });
+    });
     
     console.log('All images cleared');
   } catch (error) {
@@ -0,0 +1,206 @@
+// In-memory stand-in for the chrome.* APIs used by the service worker
+// chrome.storage.local serializes values as JSON, so every get/set goes
+// through a JSON round trip and the serialized bytes are counted.
+
+function createEvent() {
+  const listeners = [];
+  return {
+    listeners,
+    addListener: (listener) => listeners.push(listener),
+    removeListener: (listener) => {
+      const index = listeners.indexOf(listener);
+      if (index !== -1) listeners.splice(index, 1);
+    },
+    hasListener: (listener) => listeners.includes(listener)
+  };
+}
+
+// Support both the promise and the callback form of chrome APIs
+function settle(value, callback) {
+  const promise = new Promise(resolve => setImmediate(() => resolve(value)));
+  if (typeof callback === 'function') {
+    promise.then(callback);
+    return undefined;
+  }
+  return promise;
+}
+
+// One end of a runtime port; messages are cloned and delivered asynchronously
+function createPort(name, sender) {
+  const port = {
+    name,
+    sender,
+    onMessage: createEvent(),
+    onDisconnect: createEvent(),
+    other: null,
+    connected: true,
+
+    postMessage(message) {
+      if (!port.connected) {
+        throw new Error('Attempting to use a disconnected port object');
+      }
+      const clone = JSON.parse(JSON.stringify(message));
+      setImmediate(() => {
+        if (port.other.connected) {
+          port.other.onMessage.listeners.forEach(listener => listener(clone, port.other));
+        }
+      });
+    },
+
+    disconnect() {
+      if (!port.connected) return;
+      port.connected = false;
+      port.other.connected = false;
+      setImmediate(() => port.other.onDisconnect.listeners.forEach(listener => listener(port.other)));
+    }
+  };
+  return port;
+}
+
+function createStorageArea(stats, onChanged) {
+  const data = new Map();
+
+  const normalizeKeys = (keys) => {
+    if (keys === null || keys === undefined) return { names: Array.from(data.keys()), defaults: {} };
+    if (typeof keys === 'string') return { names: [keys], defaults: {} };
+    if (Array.isArray(keys)) return { names: keys, defaults: {} };
+    return { names: Object.keys(keys), defaults: keys };
+  };
+
+  return {
+    get(keys, callback) {
+      const { names, defaults } = normalizeKeys(keys);
+      const result = {};
+      for (const name of names) {
+        if (data.has(name)) {
+          const json = data.get(name);
+          stats.storageBytesRead += json.length;
+          result[name] = JSON.parse(json);
+        } else if (name in defaults) {
+          result[name] = defaults[name];
+        }
+      }
+      return settle(result, callback);
+    },
+
+    set(items, callback) {
+      const changes = {};
+      for (const [name, value] of Object.entries(items)) {
+        const json = JSON.stringify(value);
+        stats.storageBytesWritten += json.length;
+        if (onChanged.listeners.length > 0) {
+          changes[name] = {
+            oldValue: data.has(name) ? JSON.parse(data.get(name)) : undefined,
+            newValue: JSON.parse(json)
+          };
+        }
+        data.set(name, json);
+      }
+      if (onChanged.listeners.length > 0) {
+        setImmediate(() => onChanged.listeners.forEach(listener => listener(changes, 'local')));
+      }
+      return settle(undefined, callback);
+    },
+
+    remove(keys, callback) {
+      for (const name of Array.isArray(keys) ? keys : [keys]) {
+        data.delete(name);
+      }
+      return settle(undefined, callback);
+    },
+
+    clear(callback) {
+      data.clear();
+      return settle(undefined, callback);
+    },
+
+    getBytesInUse(keys, callback) {
+      const { names } = normalizeKeys(keys);
+      const bytes = names.reduce((total, name) => total + (data.has(name) ? name.length + data.get(name).length : 0), 0);
+      return settle(bytes, callback);
+    }
+  };
+}
+
+function createFakeChrome(stats) {
+  const onMessage = createEvent();
+  const onConnect = createEvent();
+  const onStorageChanged = createEvent();
+  const contentScriptSender = { id: 'sideclip-bench', tab: { id: 1, url: 'https://example.com/' } };
+
+  const runtime = {
+    id: 'sideclip-bench',
+    lastError: undefined,
+    onMessage,
+    onConnect,
+    onInstalled: createEvent(),
+    getURL: (path) => `chrome-extension://sideclip-bench/${path}`,
+
+    // Deliver to onMessage listeners the way the browser does
+    sendMessage(message, callback) {
+      const promise = new Promise((resolve) => {
+        let responded = false;
+        const sendResponse = (response) => {
+          if (responded) return;
+          responded = true;
+          resolve(response);
+        };
+        onMessage.listeners.forEach(listener => listener(JSON.parse(JSON.stringify(message)), contentScriptSender, sendResponse));
+      });
+      if (typeof callback === 'function') {
+        promise.then(callback);
+        return undefined;
+      }
+      return promise;
+    },
+
+    // Connect as a content script; the worker end is handed to onConnect listeners
+    connect(connectInfo = {}) {
+      const client = createPort(connectInfo.name || '', undefined);
+      const worker = createPort(connectInfo.name || '', contentScriptSender);
+      client.other = worker;
+      worker.other = client;
+      setImmediate(() => onConnect.listeners.forEach(listener => listener(worker)));
+      return client;
+    }
+  };
+
+  const resolved = () => Promise.resolve();
+
+  return {
+    runtime,
+    storage: {
+      local: createStorageArea(stats, onStorageChanged),
+      onChanged: onStorageChanged
+    },
+    contextMenus: {
+      removeAll: (callback) => settle(undefined, callback),
+      create: (properties, callback) => {
+        if (callback) setImmediate(callback);
+        return properties.id;
+      },
+      onClicked: createEvent()
+    },
+    action: {
+      setBadgeText: resolved,
+      setBadgeBackgroundColor: resolved,
+      setTitle: resolved,
+      onClicked: createEvent()
+    },
+    sidePanel: {
+      setPanelBehavior: resolved,
+      setOptions: resolved,
+      open: resolved
+    },
+    commands: {
+      onCommand: createEvent()
+    },
+    tabs: {
+      query: () => Promise.resolve([]),
+      onActivated: createEvent(),
+      onRemoved: createEvent()
+    }
+  };
+}
+
+module.exports = { createFakeChrome };
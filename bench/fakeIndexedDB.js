@@ -0,0 +1,283 @@
+// In-memory stand-in for IndexedDB, covering the subset SideClip uses
+// Requests complete asynchronously and transactions complete once their
+// last request has settled, so callback ordering matches the browser.
+
+function estimateSize(value) {
+  if (value instanceof Blob) return value.size;
+  if (value === null || value === undefined) return 0;
+  if (typeof value === 'string') return value.length;
+  if (typeof value !== 'object') return 8;
+  if (ArrayBuffer.isView(value) || value instanceof ArrayBuffer) return value.byteLength;
+
+  let size = 0;
+  for (const [key, field] of Object.entries(value)) {
+    size += key.length + estimateSize(field);
+  }
+  return size;
+}
+
+function domError(name, message) {
+  const error = new Error(message);
+  error.name = name;
+  return error;
+}
+
+class FakeRequest {
+  constructor(source, transaction) {
+    this.source = source;
+    this.transaction = transaction;
+    this.result = undefined;
+    this.error = null;
+    this.readyState = 'pending';
+    this.onsuccess = null;
+    this.onerror = null;
+  }
+}
+
+class FakeObjectStore {
+  constructor(transaction, storeData) {
+    this.transaction = transaction;
+    this.storeData = storeData;
+    this.name = storeData.name;
+    this.keyPath = storeData.keyPath;
+  }
+
+  createIndex(name, keyPath, options = {}) {
+    this.storeData.indexes.set(name, { keyPath, options });
+    return { name, keyPath };
+  }
+
+  add(value) {
+    return this.write(value, false);
+  }
+
+  put(value) {
+    return this.write(value, true);
+  }
+
+  write(value, overwrite) {
+    this.transaction.assertWritable();
+    const record = structuredClone(value);
+    const key = record[this.keyPath];
+
+    return this.transaction.queue(this, () => {
+      if (!overwrite && this.storeData.records.has(key)) {
+        throw domError('ConstraintError', `Key already exists in the object store: ${key}`);
+      }
+      this.storeData.records.set(key, record);
+      this.transaction.stats.idbBytesWritten += estimateSize(record);
+      return key;
+    });
+  }
+
+  get(key) {
+    return this.transaction.queue(this, () => {
+      const record = this.storeData.records.get(key);
+      if (record === undefined) return undefined;
+      this.transaction.stats.idbBytesRead += estimateSize(record);
+      return structuredClone(record);
+    });
+  }
+
+  getAll() {
+    return this.transaction.queue(this, () => {
+      return this.sortedKeys().map(key => {
+        const record = this.storeData.records.get(key);
+        this.transaction.stats.idbBytesRead += estimateSize(record);
+        return structuredClone(record);
+      });
+    });
+  }
+
+  getAllKeys() {
+    return this.transaction.queue(this, () => this.sortedKeys());
+  }
+
+  count() {
+    return this.transaction.queue(this, () => this.storeData.records.size);
+  }
+
+  delete(key) {
+    this.transaction.assertWritable();
+    return this.transaction.queue(this, () => {
+      this.storeData.records.delete(key);
+      return undefined;
+    });
+  }
+
+  clear() {
+    this.transaction.assertWritable();
+    return this.transaction.queue(this, () => {
+      this.storeData.records.clear();
+      return undefined;
+    });
+  }
+
+  sortedKeys() {
+    return Array.from(this.storeData.records.keys()).sort((a, b) => (a < b ? -1 : a > b ? 1 : 0));
+  }
+}
+
+class FakeTransaction {
+  constructor(db, storeNames, mode) {
+    this.db = db;
+    this.storeNames = storeNames;
+    this.mode = mode;
+    this.stats = db.stats;
+    this.error = null;
+    this.oncomplete = null;
+    this.onerror = null;
+    this.onabort = null;
+    this.pending = 0;
+    this.finished = false;
+
+    // A transaction with no requests still completes
+    setImmediate(() => this.maybeComplete());
+  }
+
+  objectStore(name) {
+    if (!this.storeNames.includes(name)) {
+      throw domError('NotFoundError', `Object store not in transaction scope: ${name}`);
+    }
+    return new FakeObjectStore(this, this.db.stores.get(name));
+  }
+
+  assertWritable() {
+    if (this.mode !== 'readwrite' && this.mode !== 'versionchange') {
+      throw domError('ReadOnlyError', 'The transaction is read-only');
+    }
+  }
+
+  queue(source, operation) {
+    if (this.finished) {
+      throw domError('TransactionInactiveError', 'The transaction has finished');
+    }
+
+    const request = new FakeRequest(source, this);
+    this.pending++;
+
+    setImmediate(() => {
+      if (this.finished) return;
+      try {
+        request.result = operation();
+        request.readyState = 'done';
+        if (request.onsuccess) request.onsuccess({ target: request });
+      } catch (error) {
+        request.error = error;
+        request.readyState = 'done';
+        if (request.onerror) request.onerror({ target: request });
+        this.abort(error);
+      }
+      this.pending--;
+      setImmediate(() => this.maybeComplete());
+    });
+
+    return request;
+  }
+
+  maybeComplete() {
+    if (this.finished || this.pending > 0) return;
+    this.finished = true;
+    if (this.oncomplete) this.oncomplete({ target: this });
+  }
+
+  abort(error = null) {
+    if (this.finished) return;
+    this.finished = true;
+    this.error = error;
+    if (error && this.onerror) this.onerror({ target: this });
+    if (this.onabort) this.onabort({ target: this });
+  }
+}
+
+class FakeDatabase {
+  constructor(name, stats) {
+    this.name = name;
+    this.version = 0;
+    this.stores = new Map();
+    this.stats = stats;
+  }
+
+  get objectStoreNames() {
+    const names = Array.from(this.stores.keys());
+    return {
+      length: names.length,
+      contains: (name) => this.stores.has(name),
+      item: (index) => names[index] || null,
+      [Symbol.iterator]: () => names[Symbol.iterator]()
+    };
+  }
+
+  createObjectStore(name, options = {}) {
+    const storeData = { name, keyPath: options.keyPath, records: new Map(), indexes: new Map() };
+    this.stores.set(name, storeData);
+    return new FakeObjectStore(this.upgradeTransaction, storeData);
+  }
+
+  deleteObjectStore(name) {
+    this.stores.delete(name);
+  }
+
+  transaction(storeNames, mode = 'readonly') {
+    const names = Array.isArray(storeNames) ? storeNames : [storeNames];
+    for (const name of names) {
+      if (!this.stores.has(name)) {
+        throw domError('NotFoundError', `Object store not found: ${name}`);
+      }
+    }
+    return new FakeTransaction(this, names, mode);
+  }
+
+  close() {}
+}
+
+// Create an indexedDB factory with its own databases and byte counters
+function createFakeIndexedDB(stats = { idbBytesWritten: 0, idbBytesRead: 0 }) {
+  const databases = new Map();
+
+  return {
+    stats,
+
+    open(name, version = 1) {
+      const request = new FakeRequest(null, null);
+      request.onupgradeneeded = null;
+
+      setImmediate(() => {
+        let db = databases.get(name);
+        if (!db) {
+          db = new FakeDatabase(name, stats);
+          databases.set(name, db);
+        }
+
+        if (version > db.version) {
+          const oldVersion = db.version;
+          db.version = version;
+          db.upgradeTransaction = new FakeTransaction(db, [], 'versionchange');
+          request.result = db;
+          request.transaction = db.upgradeTransaction;
+          if (request.onupgradeneeded) {
+            request.onupgradeneeded({ target: request, oldVersion, newVersion: version });
+          }
+          request.transaction = null;
+        }
+
+        request.result = db;
+        request.readyState = 'done';
+        if (request.onsuccess) request.onsuccess({ target: request });
+      });
+
+      return request;
+    },
+
+    deleteDatabase(name) {
+      databases.delete(name);
+      const request = new FakeRequest(null, null);
+      setImmediate(() => {
+        if (request.onsuccess) request.onsuccess({ target: request });
+      });
+      return request;
+    }
+  };
+}
+
+module.exports = { createFakeIndexedDB, estimateSize };
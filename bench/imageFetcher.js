@@ -0,0 +1,147 @@
+// Checks ImageFetcher against a local HTTP stand-in server
+//
+// Usage: node bench/imageFetcher.js
+const http = require('http');
+
+const ImageFetcher = require('../imageFetcher');
+
+const MAX_BYTES = 5000;
+const TIMEOUT_MS = 300;
+
+function startServer() {
+  const hits = new Map();
+  let active = 0;
+  let peakActive = 0;
+
+  const server = http.createServer((request, response) => {
+    hits.set(request.url, (hits.get(request.url) || 0) + 1);
+    active++;
+    peakActive = Math.max(peakActive, active);
+    response.on('close', () => active--);
+
+    if (request.url.startsWith('/small')) {
+      // Slow enough that concurrent requests overlap
+      setTimeout(() => {
+        response.writeHead(200, { 'Content-Type': 'image/png' });
+        response.end(Buffer.alloc(1000));
+      }, 50);
+    } else if (request.url === '/announced-oversize') {
+      response.writeHead(200, { 'Content-Type': 'image/png', 'Content-Length': MAX_BYTES * 2 });
+      response.end(Buffer.alloc(MAX_BYTES * 2));
+    } else if (request.url === '/chunked-oversize') {
+      // No Content-Length; only the running byte cap can catch this
+      response.writeHead(200, { 'Content-Type': 'image/png' });
+      let sent = 0;
+      const timer = setInterval(() => {
+        if (sent > MAX_BYTES * 4 || response.destroyed) {
+          clearInterval(timer);
+          response.end();
+          return;
+        }
+        response.write(Buffer.alloc(1000));
+        sent += 1000;
+      }, 1);
+    } else if (request.url === '/stall') {
+      response.writeHead(200, { 'Content-Type': 'image/png' });
+      response.write(Buffer.alloc(10));
+    } else {
+      response.writeHead(404);
+      response.end();
+    }
+  });
+
+  return new Promise((resolve) => {
+    server.listen(0, '127.0.0.1', () => {
+      resolve({
+        server,
+        baseUrl: `http://127.0.0.1:${server.address().port}`,
+        hits,
+        peakActive: () => peakActive,
+        resetPeak: () => { peakActive = active; }
+      });
+    });
+  });
+}
+
+async function expectRejection(promise, check) {
+  try {
+    await promise;
+  } catch (error) {
+    return check(error);
+  }
+  return false;
+}
+
+async function main() {
+  const originalLog = console.log;
+  console.log = () => {}; // ImageFetcher logs every download
+
+  const stub = await startServer();
+  const { baseUrl } = stub;
+  const fetcher = new ImageFetcher({ maxBytes: MAX_BYTES, timeoutMs: TIMEOUT_MS, maxConcurrent: 2 });
+  const results = [];
+
+  const check = async (name, run) => {
+    try {
+      results.push([name, await run()]);
+    } catch (error) {
+      results.push([name, false, error.message]);
+    }
+  };
+
+  await check('downloads a small image', async () => {
+    const image = await fetcher.fetch(`${baseUrl}/small`);
+    return image.size === 1000 && image.type === 'image/png';
+  });
+
+  await check('rejects an oversized Content-Length', () =>
+    expectRejection(fetcher.fetch(`${baseUrl}/announced-oversize`), error => error.tooLarge === true));
+
+  await check('stops a chunked body at the byte cap', () =>
+    expectRejection(fetcher.fetch(`${baseUrl}/chunked-oversize`), error => error.tooLarge === true));
+
+  await check('times out a stalled body', async () => {
+    const start = Date.now();
+    const rejected = await expectRejection(fetcher.fetch(`${baseUrl}/stall`), error => /timed out/.test(error.message));
+    return rejected && Date.now() - start < TIMEOUT_MS * 3;
+  });
+
+  await check('rejects a 404', () =>
+    expectRejection(fetcher.fetch(`${baseUrl}/missing`), error => /404/.test(error.message)));
+
+  await check('shares concurrent requests for the same URL', async () => {
+    const url = `${baseUrl}/small-shared`;
+    const [first, second] = await Promise.all([fetcher.fetch(url), fetcher.fetch(url)]);
+    return first === second && stub.hits.get('/small-shared') === 1;
+  });
+
+  await check('limits concurrent downloads', async () => {
+    stub.resetPeak();
+    await Promise.all([1, 2, 3, 4, 5].map(i => fetcher.fetch(`${baseUrl}/small-${i}`)));
+    return stub.peakActive() <= 2;
+  });
+
+  await check('remembers recently stored images', () => {
+    fetcher.rememberImage(`${baseUrl}/small`, 'image-1');
+    const remembered = fetcher.getRecentImageId(`${baseUrl}/small`) === 'image-1';
+    fetcher.forgetImage('image-1');
+    return remembered && fetcher.getRecentImageId(`${baseUrl}/small`) === null;
+  });
+
+  stub.server.closeAllConnections();
+  stub.server.close();
+  console.log = originalLog;
+
+  let failed = 0;
+  for (const [name, passed, detail] of results) {
+    console.log(`${passed ? '✅' : '❌'} ${name}${detail ? ` (${detail})` : ''}`);
+    if (!passed) failed++;
+  }
+  console.log(failed === 0 ? '\nAll ImageFetcher checks passed' : `\n${failed} ImageFetcher check(s) failed`);
+  process.exitCode = failed === 0 ? 0 : 1;
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,201 @@
+// Checks readImageMetadata against hand-built headers for every supported format
+//
+// Usage: node bench/imageMetadata.js
+const { readImageMetadata } = require('../imageMetadata');
+
+function ascii(text) {
+  return Buffer.from(text, 'ascii');
+}
+
+function uint16BE(value) {
+  const bytes = Buffer.alloc(2);
+  bytes.writeUInt16BE(value);
+  return bytes;
+}
+
+function uint16LE(value) {
+  const bytes = Buffer.alloc(2);
+  bytes.writeUInt16LE(value);
+  return bytes;
+}
+
+function uint32BE(value) {
+  const bytes = Buffer.alloc(4);
+  bytes.writeUInt32BE(value);
+  return bytes;
+}
+
+function uint32LE(value) {
+  const bytes = Buffer.alloc(4);
+  bytes.writeUInt32LE(value);
+  return bytes;
+}
+
+// PNG chunk with a zero CRC; the parser never checks it
+function pngChunk(type, data) {
+  return Buffer.concat([uint32BE(data.length), ascii(type), data, Buffer.alloc(4)]);
+}
+
+function png(width, height, extraChunks = []) {
+  const ihdr = Buffer.concat([uint32BE(width), uint32BE(height), Buffer.from([8, 6, 0, 0, 0])]);
+  return Buffer.concat([
+    Buffer.from([0x89, 0x50, 0x4E, 0x47, 0x0D, 0x0A, 0x1A, 0x0A]),
+    pngChunk('IHDR', ihdr),
+    ...extraChunks,
+    pngChunk('IDAT', Buffer.alloc(16)),
+    pngChunk('IEND', Buffer.alloc(0))
+  ]);
+}
+
+function jpegSegment(marker, data) {
+  return Buffer.concat([Buffer.from([0xFF, marker]), uint16BE(data.length + 2), data]);
+}
+
+function jpeg(width, height, { sofMarker = 0xC0, before = [] } = {}) {
+  const sof = Buffer.concat([Buffer.from([8]), uint16BE(height), uint16BE(width), Buffer.from([3, 1, 0x22, 0, 2, 0x11, 1, 3, 0x11, 1])]);
+  return Buffer.concat([
+    Buffer.from([0xFF, 0xD8]),
+    jpegSegment(0xE0, Buffer.concat([ascii('JFIF\0'), Buffer.alloc(9)])),
+    ...before,
+    jpegSegment(sofMarker, sof),
+    jpegSegment(0xDA, Buffer.alloc(10)),
+    Buffer.from([0xFF, 0xD9])
+  ]);
+}
+
+// APP1 Exif segment whose IFD0 holds a few tags, Orientation among them
+function exifSegment(orientation, littleEndian) {
+  const u16 = littleEndian ? uint16LE : uint16BE;
+  const u32 = littleEndian ? uint32LE : uint32BE;
+  const entry = (tag, type, count, value) => Buffer.concat([u16(tag), u16(type), u32(count), value]);
+  const shortValue = value => Buffer.concat([u16(value), Buffer.alloc(2)]);
+
+  const entries = [
+    entry(0x010F, 2, 4, ascii('Cam\0')),        // Make
+    entry(0x0112, 3, 1, shortValue(orientation)), // Orientation
+    entry(0x011A, 5, 1, u32(0))                 // XResolution (offset, unused)
+  ];
+  const tiff = Buffer.concat([
+    ascii(littleEndian ? 'II' : 'MM'),
+    u16(42),
+    u32(8),
+    u16(entries.length),
+    ...entries,
+    u32(0)
+  ]);
+  return jpegSegment(0xE1, Buffer.concat([ascii('Exif\0\0'), tiff]));
+}
+
+function gif(width, height, { netscape = false, frames = 1 } = {}) {
+  const frame = Buffer.concat([
+    Buffer.from([0x2C]), uint16LE(0), uint16LE(0), uint16LE(width), uint16LE(height), Buffer.from([0]),
+    Buffer.from([2, 2, 0x4C, 0x01, 0])
+  ]);
+  const loop = Buffer.concat([Buffer.from([0x21, 0xFF, 11]), ascii('NETSCAPE2.0'), Buffer.from([3, 1, 0, 0, 0])]);
+  return Buffer.concat([
+    ascii('GIF89a'), uint16LE(width), uint16LE(height), Buffer.from([0x80, 0, 0]),
+    Buffer.alloc(6), // Global color table, 2 entries
+    ...(netscape ? [loop] : []),
+    ...Array(frames).fill(frame),
+    Buffer.from([0x3B])
+  ]);
+}
+
+function riff(chunk) {
+  return Buffer.concat([ascii('RIFF'), uint32LE(4 + chunk.length), ascii('WEBP'), chunk]);
+}
+
+function webpLossy(width, height) {
+  const data = Buffer.concat([Buffer.from([0x30, 0x01, 0x00, 0x9D, 0x01, 0x2A]), uint16LE(width), uint16LE(height), Buffer.alloc(8)]);
+  return riff(Buffer.concat([ascii('VP8 '), uint32LE(data.length), data]));
+}
+
+function webpLossless(width, height) {
+  const bits = (width - 1) | ((height - 1) << 14);
+  const data = Buffer.concat([Buffer.from([0x2F]), uint32LE(bits), Buffer.alloc(8)]);
+  return riff(Buffer.concat([ascii('VP8L'), uint32LE(data.length), data]));
+}
+
+function webpExtended(width, height, animated) {
+  const size24 = value => Buffer.from([value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF]);
+  const data = Buffer.concat([Buffer.from([animated ? 0x02 : 0x00, 0, 0, 0]), size24(width - 1), size24(height - 1)]);
+  return riff(Buffer.concat([ascii('VP8X'), uint32LE(data.length), data]));
+}
+
+function bmp(width, height) {
+  return Buffer.concat([ascii('BM'), Buffer.alloc(12), uint32LE(40), uint32LE(width), uint32LE(height >>> 0), Buffer.alloc(28)]);
+}
+
+function bmpCore(width, height) {
+  return Buffer.concat([ascii('BM'), Buffer.alloc(12), uint32LE(12), uint16LE(width), uint16LE(height), Buffer.alloc(4)]);
+}
+
+const FIXTURES = [
+  ['PNG', png(640, 480), { width: 640, height: 480, mimeType: 'image/png', animated: false }],
+  ['APNG', png(64, 32, [pngChunk('acTL', Buffer.alloc(8))]), { width: 64, height: 32, mimeType: 'image/png', animated: true }],
+  ['JPEG baseline', jpeg(1024, 768), { width: 1024, height: 768, mimeType: 'image/jpeg', animated: false }],
+  ['JPEG progressive', jpeg(300, 200, { sofMarker: 0xC2 }), { width: 300, height: 200, mimeType: 'image/jpeg', animated: false }],
+  ['JPEG with SOF past the header window',
+    jpeg(800, 600, { before: [jpegSegment(0xE2, Buffer.alloc(65000)), jpegSegment(0xE2, Buffer.alloc(65000))] }),
+    { width: 800, height: 600, mimeType: 'image/jpeg', animated: false }],
+  ['JPEG Exif orientation 1', jpeg(4032, 3024, { before: [exifSegment(1, true)] }), { width: 4032, height: 3024 }],
+  ['JPEG Exif orientation 3', jpeg(4032, 3024, { before: [exifSegment(3, false)] }), { width: 4032, height: 3024 }],
+  ['JPEG Exif orientation 6 (Intel)', jpeg(4032, 3024, { before: [exifSegment(6, true)] }), { width: 3024, height: 4032 }],
+  ['JPEG Exif orientation 8 (Motorola)', jpeg(4032, 3024, { before: [exifSegment(8, false)] }), { width: 3024, height: 4032 }],
+  ['JPEG with malformed Exif', jpeg(100, 50, { before: [jpegSegment(0xE1, Buffer.concat([ascii('Exif\0\0MM'), Buffer.alloc(2)]))] }),
+    { width: 100, height: 50 }],
+  ['GIF', gif(120, 90), { width: 120, height: 90, mimeType: 'image/gif', animated: false }],
+  ['GIF with NETSCAPE loop', gif(120, 90, { netscape: true }), { width: 120, height: 90, animated: true }],
+  ['GIF with two frames', gif(16, 16, { frames: 2 }), { width: 16, height: 16, animated: true }],
+  ['WebP lossy', webpLossy(550, 368), { width: 550, height: 368, mimeType: 'image/webp', animated: false }],
+  ['WebP lossless', webpLossless(386, 395), { width: 386, height: 395, mimeType: 'image/webp', animated: false }],
+  ['WebP VP8X', webpExtended(1000, 700, false), { width: 1000, height: 700, mimeType: 'image/webp', animated: false }],
+  ['WebP VP8X animated', webpExtended(400, 400, true), { width: 400, height: 400, animated: true }],
+  ['BMP', bmp(256, 128), { width: 256, height: 128, mimeType: 'image/bmp', animated: false }],
+  ['BMP top-down', bmp(256, -128), { width: 256, height: 128, mimeType: 'image/bmp' }],
+  ['BMP OS/2 core header', bmpCore(32, 16), { width: 32, height: 16, mimeType: 'image/bmp' }]
+];
+
+// Headers cut short must give null, not made-up dimensions
+const TRUNCATED = [
+  ['PNG', png(640, 480).subarray(0, 20)],
+  ['JPEG before SOF', jpeg(1024, 768).subarray(0, 24)],
+  ['JPEG inside SOF', jpeg(1024, 768).subarray(0, 26)],
+  ['GIF', gif(120, 90).subarray(0, 8)],
+  ['WebP lossy', webpLossy(550, 368).subarray(0, 26)],
+  ['WebP lossless', webpLossless(386, 395).subarray(0, 22)],
+  ['WebP VP8X', webpExtended(1000, 700, false).subarray(0, 26)],
+  ['BMP', bmp(256, 128).subarray(0, 20)],
+  ['Unknown format', ascii('not an image at all')]
+];
+
+async function main() {
+  const originalLog = console.log;
+  console.log = () => {}; // readImageMetadata logs malformed headers
+
+  const results = [];
+  for (const [name, bytes, expected] of FIXTURES) {
+    const metadata = await readImageMetadata(new Blob([bytes]));
+    const mismatched = Object.keys(expected).filter(key => metadata?.[key] !== expected[key]);
+    results.push([name, mismatched.length === 0, mismatched.length ? `got ${JSON.stringify(metadata)}` : null]);
+  }
+  for (const [name, bytes] of TRUNCATED) {
+    const metadata = await readImageMetadata(new Blob([bytes]));
+    results.push([`truncated ${name}`, metadata === null, metadata ? `got ${JSON.stringify(metadata)}` : null]);
+  }
+
+  console.log = originalLog;
+
+  let failed = 0;
+  for (const [name, passed, detail] of results) {
+    console.log(`${passed ? '✅' : '❌'} ${name}${detail ? ` (${detail})` : ''}`);
+    if (!passed) failed++;
+  }
+  console.log(failed === 0 ? '\nAll image metadata checks passed' : `\n${failed} image metadata check(s) failed`);
+  process.exitCode = failed === 0 ? 0 : 1;
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
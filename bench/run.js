@@ -0,0 +1,383 @@
+// Headless load test and latency benchmark for the SideClip service worker
+//
+// Usage: node bench/run.js [--texts N] [--images N] [--deletes N] [--clears N]
+//                          [--replay direct|message|port] [--batch N]
+//                          [--seed N] [--json out.json] [--compare baseline.json] [--verbose]
+//
+// --replay picks how the workload reaches the worker:
+//   direct   call the handlers directly (default)
+//   message  chrome.runtime.sendMessage, as the side panel and older content scripts do
+//   port     CAPTURE_BATCH batches over a 'sideclip-capture' port, as content.js does,
+//            with up to --batch captures per batch; other operations use messages
+const fs = require('fs');
+const { performance } = require('perf_hooks');
+
+const { loadServiceWorker, createPngBytes, createJpegBytes } = require('./workerEnv');
+
+const DEFAULT_OPTIONS = {
+  texts: 3000,
+  images: 60,
+  deletes: 20,
+  clears: 3,
+  replay: 'direct',
+  batch: 10,
+  seed: 1,
+  readEvery: 50,
+  cleanEvery: 25,
+  json: null,
+  compare: null,
+  verbose: false
+};
+
+function parseArgs(argv) {
+  const options = { ...DEFAULT_OPTIONS };
+  for (let i = 0; i < argv.length; i++) {
+    const name = argv[i].replace(/^--/, '');
+    if (name === 'verbose') {
+      options.verbose = true;
+    } else if (name in options) {
+      const value = argv[++i];
+      options[name] = typeof DEFAULT_OPTIONS[name] === 'number' ? Number(value) : value;
+    } else {
+      throw new Error(`Unknown option: ${argv[i]}`);
+    }
+  }
+  return options;
+}
+
+// Seeded PRNG (mulberry32) so runs are reproducible
+function createRandom(seed) {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function logUniform(random, min, max) {
+  return Math.round(Math.exp(Math.log(min) + random() * (Math.log(max) - Math.log(min))));
+}
+
+function shuffle(random, items) {
+  for (let i = items.length - 1; i > 0; i--) {
+    const j = Math.floor(random() * (i + 1));
+    [items[i], items[j]] = [items[j], items[i]];
+  }
+  return items;
+}
+
+// Text from a few bytes up to large pasted logs and source files
+function createText(random, index) {
+  const size = logUniform(random, 8, 256 * 1024);
+  const line = `${index} [INFO] request handled in ${Math.floor(random() * 1000)}ms {"path":"/api/items","status":200}\n`;
+  return line.repeat(Math.ceil(size / line.length)).substring(0, size);
+}
+
+// Image capture as it arrives from the content script: blob plus data URL
+async function createImageCapture(random, index) {
+  const size = logUniform(random, 10 * 1024, 5 * 1024 * 1024);
+  const side = Math.max(16, Math.round(Math.sqrt(size / 2)));
+  const isPng = random() < 0.7;
+  const bytes = isPng ? createPngBytes(side, side, size) : createJpegBytes(side, side, size);
+  const type = isPng ? 'image/png' : 'image/jpeg';
+  const blob = new Blob([bytes], { type });
+
+  return {
+    blob,
+    size: blob.size,
+    type,
+    url: `https://example.com/images/${index}.${isPng ? 'png' : 'jpg'}`,
+    dataUrl: `data:${type};base64,${bytes.toString('base64')}`
+  };
+}
+
+// Same limits content.js applies when batching captures
+const MAX_CAPTURE_BATCH_BYTES = 8 * 1024 * 1024;
+
+// Call the service worker handlers directly
+function createDirectDriver(worker, recorder, imageDB) {
+  const {
+    handleTextCopied,
+    handleImageCopied,
+    getClipboardData,
+    deleteImage,
+    clearAllImages
+  } = worker.context;
+
+  return {
+    copyText: text => recorder.measure('handleTextCopied', () => handleTextCopied(text)),
+    copyImage: capture => recorder.measure('handleImageCopied', () => handleImageCopied(capture, { url: 'https://example.com/' })),
+    read: () => recorder.measure('getClipboardData', () => getClipboardData()),
+    deleteImage: imageId => recorder.measure('deleteImage', () => deleteImage(imageId)),
+    clearAll: () => recorder.measure('clearAll', async () => {
+      // Mirrors clearAllHistory in sidepanel.js
+      await worker.chrome.storage.local.set({ clipboardHistory: [] });
+      await clearAllImages();
+      await imageDB.clearAllTexts();
+    }),
+    flush: async () => {}
+  };
+}
+
+// Go through chrome.runtime.sendMessage and the worker's onMessage listener
+function createMessageDriver(worker, recorder, imageDB) {
+  const send = message => worker.chrome.runtime.sendMessage(message);
+
+  return {
+    copyText: text => recorder.measure('message:TEXT_COPIED', () => send({ type: 'TEXT_COPIED', text })),
+    copyImage: capture => recorder.measure('message:IMAGE_COPIED', () =>
+      send({ type: 'IMAGE_COPIED', imageData: capture.dataUrl, mimeType: capture.type })),
+    read: () => recorder.measure('message:GET_CLIPBOARD_DATA', () => send({ type: 'GET_CLIPBOARD_DATA' })),
+    deleteImage: imageId => recorder.measure('message:DELETE_IMAGE', () => send({ type: 'DELETE_IMAGE', imageId })),
+    clearAll: () => recorder.measure('message:clearAll', async () => {
+      await worker.chrome.storage.local.set({ clipboardHistory: [] });
+      await send({ type: 'CLEAR_ALL_IMAGES' });
+      await imageDB.clearAllTexts();
+    }),
+    flush: async () => {}
+  };
+}
+
+// Batch captures over a capture port the way content.js does, waiting for each ack
+function createPortDriver(worker, recorder, imageDB, batchSize) {
+  const messages = createMessageDriver(worker, recorder, imageDB);
+  const port = worker.chrome.runtime.connect({ name: 'sideclip-capture' });
+  const sessionId = `bench-${Date.now()}`;
+  const pendingAcks = new Map();
+  let nextBatchId = 1;
+  let entries = [];
+  let entryBytes = 0;
+
+  port.onMessage.addListener((message) => {
+    if (message.type === 'CAPTURE_ACK' && pendingAcks.has(message.batchId)) {
+      pendingAcks.get(message.batchId)();
+      pendingAcks.delete(message.batchId);
+    }
+  });
+
+  const flush = async () => {
+    if (entries.length === 0) return;
+    const batch = { type: 'CAPTURE_BATCH', sessionId, batchId: nextBatchId++, entries };
+    entries = [];
+    entryBytes = 0;
+    await recorder.measure('port:CAPTURE_BATCH', () => new Promise((resolve) => {
+      pendingAcks.set(batch.batchId, resolve);
+      port.postMessage(batch);
+    }));
+  };
+
+  const enqueue = async (entry, size) => {
+    if (entries.length > 0 && entryBytes + size > MAX_CAPTURE_BATCH_BYTES) {
+      await flush();
+    }
+    entries.push(entry);
+    entryBytes += size;
+    if (entries.length >= batchSize) {
+      await flush();
+    }
+  };
+
+  return {
+    copyText: text => enqueue({ type: 'TEXT_COPIED', text }, text.length),
+    copyImage: capture => enqueue({ type: 'IMAGE_COPIED', imageData: capture.dataUrl, mimeType: capture.type }, capture.dataUrl.length),
+    read: async () => { await flush(); await messages.read(); },
+    deleteImage: async (imageId) => { await flush(); await messages.deleteImage(imageId); },
+    clearAll: async () => { await flush(); await messages.clearAll(); },
+    flush
+  };
+}
+
+function createDriver(options, worker, recorder, imageDB) {
+  if (options.replay === 'direct') return createDirectDriver(worker, recorder, imageDB);
+  if (options.replay === 'message') return createMessageDriver(worker, recorder, imageDB);
+  if (options.replay === 'port') return createPortDriver(worker, recorder, imageDB, options.batch);
+  throw new Error(`Unknown replay mode: ${options.replay}`);
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  const index = Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1);
+  return sorted[Math.max(0, index)];
+}
+
+class Recorder {
+  constructor(stats) {
+    this.stats = stats;
+    this.handlers = new Map();
+    this.peakHeap = 0;
+    this.peakRss = 0;
+  }
+
+  sampleMemory() {
+    const usage = process.memoryUsage();
+    this.peakHeap = Math.max(this.peakHeap, usage.heapUsed);
+    this.peakRss = Math.max(this.peakRss, usage.rss);
+  }
+
+  async measure(name, operation) {
+    const before = { ...this.stats };
+    const sampler = setInterval(() => this.sampleMemory(), 5);
+
+    const start = performance.now();
+    try {
+      await operation();
+    } finally {
+      const elapsed = performance.now() - start;
+      clearInterval(sampler);
+      this.sampleMemory();
+
+      if (!this.handlers.has(name)) {
+        this.handlers.set(name, { latencies: [], storageWritten: 0, storageRead: 0, idbWritten: 0, idbRead: 0 });
+      }
+      const entry = this.handlers.get(name);
+      entry.latencies.push(elapsed);
+      entry.storageWritten += this.stats.storageBytesWritten - before.storageBytesWritten;
+      entry.storageRead += this.stats.storageBytesRead - before.storageBytesRead;
+      entry.idbWritten += this.stats.idbBytesWritten - before.idbBytesWritten;
+      entry.idbRead += this.stats.idbBytesRead - before.idbBytesRead;
+    }
+  }
+
+  summary() {
+    const handlers = {};
+    for (const [name, entry] of this.handlers) {
+      const sorted = entry.latencies.slice().sort((a, b) => a - b);
+      const count = sorted.length;
+      handlers[name] = {
+        count,
+        p50Ms: percentile(sorted, 50),
+        p99Ms: percentile(sorted, 99),
+        maxMs: sorted[count - 1],
+        storageBytesWrittenPerOp: entry.storageWritten / count,
+        storageBytesReadPerOp: entry.storageRead / count,
+        idbBytesWrittenPerOp: entry.idbWritten / count,
+        idbBytesReadPerOp: entry.idbRead / count
+      };
+    }
+    return {
+      handlers,
+      peakHeapBytes: this.peakHeap,
+      peakRssBytes: this.peakRss,
+      errors: this.stats.errors
+    };
+  }
+}
+
+function formatBytes(bytes) {
+  if (bytes < 1024) return `${Math.round(bytes)} B`;
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${(bytes / 1024 / 1024).toFixed(2)} MB`;
+}
+
+function formatDelta(current, baseline) {
+  if (baseline === undefined || baseline === 0) return '';
+  const change = ((current - baseline) / baseline) * 100;
+  return ` (${change >= 0 ? '+' : ''}${change.toFixed(0)}%)`;
+}
+
+function printReport(result, baseline) {
+  const rows = [['handler', 'ops', 'p50 ms', 'p99 ms', 'max ms', 'storage w/op', 'storage r/op', 'idb w/op', 'idb r/op']];
+
+  for (const [name, h] of Object.entries(result.handlers)) {
+    const b = baseline?.handlers?.[name] || {};
+    rows.push([
+      name,
+      String(h.count),
+      h.p50Ms.toFixed(2) + formatDelta(h.p50Ms, b.p50Ms),
+      h.p99Ms.toFixed(2) + formatDelta(h.p99Ms, b.p99Ms),
+      h.maxMs.toFixed(2),
+      formatBytes(h.storageBytesWrittenPerOp) + formatDelta(h.storageBytesWrittenPerOp, b.storageBytesWrittenPerOp),
+      formatBytes(h.storageBytesReadPerOp) + formatDelta(h.storageBytesReadPerOp, b.storageBytesReadPerOp),
+      formatBytes(h.idbBytesWrittenPerOp) + formatDelta(h.idbBytesWrittenPerOp, b.idbBytesWrittenPerOp),
+      formatBytes(h.idbBytesReadPerOp) + formatDelta(h.idbBytesReadPerOp, b.idbBytesReadPerOp)
+    ]);
+  }
+
+  const widths = rows[0].map((_, column) => Math.max(...rows.map(row => row[column].length)));
+  for (const row of rows) {
+    console.log(row.map((cell, column) => (column === 0 ? cell.padEnd(widths[column]) : cell.padStart(widths[column]))).join('  '));
+  }
+
+  console.log('');
+  console.log(`Peak heap: ${formatBytes(result.peakHeapBytes)}${formatDelta(result.peakHeapBytes, baseline?.peakHeapBytes)}`);
+  console.log(`Peak RSS:  ${formatBytes(result.peakRssBytes)}${formatDelta(result.peakRssBytes, baseline?.peakRssBytes)}`);
+  console.log(`Errors logged by the service worker: ${result.errors}`);
+}
+
+async function run(options) {
+  const random = createRandom(options.seed);
+  const worker = loadServiceWorker({ verbose: options.verbose });
+  const recorder = new Recorder(worker.stats);
+
+  const imageDB = await worker.context.initImageDB();
+  const driver = createDriver(options, worker, recorder, imageDB);
+
+  const operations = shuffle(random, [
+    ...Array(options.texts).fill('text'),
+    ...Array(options.images).fill('image'),
+    ...Array(options.deletes).fill('delete'),
+    ...Array(options.clears).fill('clear')
+  ]);
+
+  const recentTexts = [];
+
+  for (let i = 0; i < operations.length; i++) {
+    const operation = operations[i];
+
+    if (operation === 'text') {
+      // Some copies repeat an earlier text, which moves it back to the top
+      const text = recentTexts.length > 0 && random() < 0.1
+        ? recentTexts[Math.floor(random() * recentTexts.length)]
+        : createText(random, i);
+      recentTexts.push(text);
+      if (recentTexts.length > 20) recentTexts.shift();
+      await driver.copyText(text);
+    } else if (operation === 'image') {
+      const capture = await createImageCapture(random, i);
+      await driver.copyImage(capture);
+    } else if (operation === 'delete') {
+      await driver.flush();
+      const result = await worker.chrome.storage.local.get(['clipboardHistory']);
+      const images = (result.clipboardHistory || []).filter(item => item.type === 'image');
+      if (images.length > 0) {
+        const target = images[Math.floor(random() * images.length)];
+        await driver.deleteImage(target.imageId || target.id);
+      }
+    } else if (operation === 'clear') {
+      await driver.clearAll();
+    }
+
+    if ((i + 1) % options.readEvery === 0) {
+      await driver.read();
+    }
+    if ((i + 1) % options.cleanEvery === 0) {
+      await recorder.measure('cleanOldImages', () => imageDB.cleanOldImages(50));
+    }
+  }
+  await driver.flush();
+
+  return recorder.summary();
+}
+
+async function main() {
+  const options = parseArgs(process.argv.slice(2));
+  console.log(`SideClip benchmark: ${options.texts} texts, ${options.images} images, ` +
+    `${options.deletes} deletes, ${options.clears} clear-alls, ${options.replay} replay (seed ${options.seed})\n`);
+
+  const result = await run(options);
+  const baseline = options.compare ? JSON.parse(fs.readFileSync(options.compare, 'utf8')) : null;
+  printReport(result, baseline);
+
+  if (options.json) {
+    fs.writeFileSync(options.json, JSON.stringify({ options, ...result }, null, 2));
+    console.log(`\nResults written to ${options.json}`);
+  }
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
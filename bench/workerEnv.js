@@ -0,0 +1,178 @@
+// Service worker global scope for running background.js unmodified in Node
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const { createFakeChrome } = require('./fakeChrome');
+const { createFakeIndexedDB } = require('./fakeIndexedDB');
+const { readImageMetadata } = require('../imageMetadata');
+
+const EXTENSION_ROOT = path.resolve(__dirname, '..');
+
+// FileReader is not available in Node; only the methods SideClip uses
+class FakeFileReader {
+  constructor() {
+    this.result = null;
+    this.error = null;
+    this.onload = null;
+    this.onerror = null;
+  }
+
+  readAsDataURL(blob) {
+    this.read(blob, (buffer) => `data:${blob.type || 'application/octet-stream'};base64,${buffer.toString('base64')}`);
+  }
+
+  readAsArrayBuffer(blob) {
+    this.read(blob, (buffer) => buffer.buffer.slice(buffer.byteOffset, buffer.byteOffset + buffer.byteLength));
+  }
+
+  readAsText(blob) {
+    this.read(blob, (buffer) => buffer.toString('utf8'));
+  }
+
+  read(blob, convert) {
+    blob.arrayBuffer().then((arrayBuffer) => {
+      this.result = convert(Buffer.from(arrayBuffer));
+      if (this.onload) this.onload({ target: this });
+    }, (error) => {
+      this.error = error;
+      if (this.onerror) this.onerror({ target: this });
+    });
+  }
+}
+
+// Image decoding stand-ins: dimensions come from the header, pixels are not decoded
+async function fakeCreateImageBitmap(blob) {
+  const metadata = await readImageMetadata(blob);
+  if (!metadata) {
+    throw new Error('The source image could not be decoded.');
+  }
+  return { width: metadata.width, height: metadata.height, close: () => {} };
+}
+
+class FakeOffscreenCanvas {
+  constructor(width, height) {
+    this.width = width;
+    this.height = height;
+  }
+
+  getContext() {
+    const noop = () => {};
+    return {
+      fillRect: noop,
+      strokeRect: noop,
+      fillText: noop,
+      drawImage: noop,
+      fillStyle: '',
+      strokeStyle: '',
+      lineWidth: 1,
+      font: '',
+      textAlign: 'start'
+    };
+  }
+
+  // Roughly the size a real PNG encode of photographic content produces
+  async convertToBlob(options = {}) {
+    const type = options.type || 'image/png';
+    return new Blob([createPngBytes(this.width, this.height, this.width * this.height * 2)], { type });
+  }
+}
+
+// Minimal PNG: signature, IHDR and filler up to the requested size
+function createPngBytes(width, height, totalSize) {
+  const bytes = Buffer.alloc(Math.max(totalSize, 33));
+  Buffer.from([0x89, 0x50, 0x4E, 0x47, 0x0D, 0x0A, 0x1A, 0x0A]).copy(bytes, 0);
+  bytes.writeUInt32BE(13, 8);
+  bytes.write('IHDR', 12, 'ascii');
+  bytes.writeUInt32BE(width, 16);
+  bytes.writeUInt32BE(height, 20);
+  bytes[24] = 8; // Bit depth
+  bytes[25] = 6; // RGBA
+  return bytes;
+}
+
+// Minimal baseline JPEG: SOI, APP0 and SOF0, then filler up to the requested size
+function createJpegBytes(width, height, totalSize) {
+  const bytes = Buffer.alloc(Math.max(totalSize, 40));
+  Buffer.from([0xFF, 0xD8, 0xFF, 0xE0, 0x00, 0x10]).copy(bytes, 0);
+  bytes.write('JFIF', 6, 'ascii');
+  Buffer.from([0xFF, 0xC0, 0x00, 0x11, 0x08]).copy(bytes, 20);
+  bytes.writeUInt16BE(height, 25);
+  bytes.writeUInt16BE(width, 27);
+  return bytes;
+}
+
+// Create a context with chrome.*, indexedDB and worker globals, then load the service worker
+function loadServiceWorker(options = {}) {
+  const stats = {
+    storageBytesRead: 0,
+    storageBytesWritten: 0,
+    idbBytesRead: 0,
+    idbBytesWritten: 0,
+    errors: 0
+  };
+
+  const quietConsole = {
+    log: () => {},
+    info: () => {},
+    debug: () => {},
+    warn: () => {},
+    error: (...args) => {
+      stats.errors++;
+      if (options.verbose) console.error(...args);
+    }
+  };
+
+  const sandbox = {
+    console: options.verbose ? console : quietConsole,
+    chrome: createFakeChrome(stats),
+    indexedDB: createFakeIndexedDB(stats),
+    FileReader: FakeFileReader,
+    OffscreenCanvas: FakeOffscreenCanvas,
+    createImageBitmap: fakeCreateImageBitmap,
+    navigator: {},
+    fetch,
+    Blob,
+    Response,
+    Request,
+    Headers,
+    AbortController,
+    URL,
+    TextEncoder,
+    TextDecoder,
+    ReadableStream,
+    WritableStream,
+    CompressionStream,
+    DecompressionStream,
+    crypto: globalThis.crypto,
+    structuredClone,
+    atob,
+    btoa,
+    setTimeout,
+    clearTimeout,
+    setInterval,
+    clearInterval,
+    queueMicrotask
+  };
+  sandbox.self = sandbox;
+
+  const context = vm.createContext(sandbox);
+
+  const runScript = (file) => {
+    const filename = path.join(EXTENSION_ROOT, file);
+    vm.runInContext(fs.readFileSync(filename, 'utf8'), context, { filename });
+  };
+  sandbox.importScripts = (...files) => files.forEach(runScript);
+
+  runScript('background.js');
+
+  return {
+    context,
+    chrome: sandbox.chrome,
+    stats,
+    // Evaluate an expression in the worker scope, e.g. a top-level let binding
+    evaluate: (source) => vm.runInContext(source, context)
+  };
+}
+
+module.exports = { loadServiceWorker, createPngBytes, createJpegBytes };
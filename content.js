@@ -1,129 +1,297 @@
 // Content script to capture copy events
 console.log('SideClip content script loaded');
 
+// A single copy usually fires both the Ctrl/Cmd+C keydown and the copy event.
+// Both only request a capture; one capture run reads the clipboard/selection,
+// and captured entries are batched over one long-lived port to the background.
+const CAPTURE_PORT_NAME = 'sideclip-capture';
+const CAPTURE_DELAY_MS = 50;        // Let the page finish updating the selection
+const DEDUPE_WINDOW_MS = 500;       // Same content within this window is one copy
+const FLUSH_DELAY_MS = 100;         // Collect entries before sending a batch
+const MAX_BATCH_SIZE = 10;
+const MAX_BATCH_BYTES = 8 * 1024 * 1024; // Well under the 64MB runtime message limit
+const MAX_QUEUE_LENGTH = 30;        // Backpressure: drop oldest entries beyond this
+const MAX_SEND_ATTEMPTS = 3;
+const ACK_TIMEOUT_MS = 15000;       // Background stalled without dropping the port
+const PORT_IDLE_TIMEOUT_MS = 30000; // Release the port so the worker can sleep
+const MAX_IMAGE_SIZE = 5 * 1024 * 1024; // Larger images are rejected by the background
+
+// Batch IDs restart on every page load, so the background tells pages apart by session
+const captureSessionId = `${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
+
+let captureTimer = null;
+let lastCapture = { key: null, time: 0 };
+
+let capturePort = null;
+let portIdleTimer = null;
+let captureQueue = [];
+let inFlightBatch = null;
+let ackTimer = null;
+let flushTimer = null;
+let nextBatchId = 1;
+
 // Listen for copy events
-document.addEventListener('copy', handleCopyEvent, true);
+document.addEventListener('copy', () => {
+  console.log('Copy event detected');
+  requestCapture();
+}, true);
+
+// Also listen for keyboard shortcuts
+document.addEventListener('keydown', (event) => {
+  // Detect Ctrl+C (or Cmd+C on Mac)
+  if ((event.ctrlKey || event.metaKey) && event.key === 'c') {
+    console.log('Ctrl+C detected');
+    requestCapture();
+  }
+}, true);
+
+// Coalesce copy and keydown triggers into a single capture run
+function requestCapture() {
+  if (captureTimer) return;
+  captureTimer = setTimeout(() => {
+    captureTimer = null;
+    captureClipboard().catch((error) => {
+      console.error('Error capturing copy event:', error);
+    });
+  }, CAPTURE_DELAY_MS);
+}
 
-async function handleCopyEvent(event) {
+async function captureClipboard() {
+  // Check clipboard for images first
   try {
-    console.log('Copy event detected');
-    
-    // Check clipboard for images
-    try {
-      const clipboardItems = await navigator.clipboard.read();
-      for (const clipboardItem of clipboardItems) {
-        // Check for images first
-        for (const type of clipboardItem.types) {
-          if (type.startsWith('image/')) {
-            console.log('Image detected in clipboard:', type);
-            const blob = await clipboardItem.getType(type);
-            const reader = new FileReader();
-            reader.onload = function(event) {
-              chrome.runtime.sendMessage({
-                type: 'IMAGE_COPIED',
-                imageData: event.target.result,
-                mimeType: type
-              }, () => {
-                // Don't wait for response
-                if (chrome.runtime.lastError) {
-                  console.log('Image message send failed:', chrome.runtime.lastError.message);
-                }
-              });
-            };
-            reader.readAsDataURL(blob);
-            return; // Exit early if image found
+    const clipboardItems = await navigator.clipboard.read();
+    for (const clipboardItem of clipboardItems) {
+      for (const type of clipboardItem.types) {
+        if (type.startsWith('image/')) {
+          console.log('Image detected in clipboard:', type);
+          const blob = await clipboardItem.getType(type);
+          if (blob.size > MAX_IMAGE_SIZE) {
+            console.log('Image too large, skipping:', blob.size);
+            return;
           }
+          if (isRepeatCapture(`image:${type}:${blob.size}`)) return;
+          const imageData = await readBlobAsDataUrl(blob);
+          enqueueCapture({ type: 'IMAGE_COPIED', imageData: imageData, mimeType: type });
+          return; // Exit early if image found
         }
       }
-    } catch (clipboardError) {
-      console.log('Clipboard API not available or failed:', clipboardError.message);
     }
-    
-    // Fallback to text detection
-    setTimeout(() => {
-      // Use selection method (more reliable)
-      const selection = window.getSelection();
-      const copiedText = selection.toString();
-      
-      // If we have text and it's not just whitespace
-      if (copiedText && copiedText.trim().length > 0) {
-        console.log('Selection text captured:', copiedText.substring(0, 50) + '...');
-        // Send the copied text to background script
-        chrome.runtime.sendMessage({
-          type: 'TEXT_COPIED',
-          text: copiedText.trim()
-        }, () => {
-          // Don't wait for response
-          if (chrome.runtime.lastError) {
-            console.log('Text message send failed:', chrome.runtime.lastError.message);
-          }
-        });
-      } else {
-        console.log('No text found in selection');
-      }
-    }, 50);
+  } catch (clipboardError) {
+    console.log('Clipboard API not available or failed:', clipboardError.message);
+  }
+
+  // Fallback to text detection using the selection (more reliable)
+  const copiedText = window.getSelection().toString().trim();
+
+  // If we have text and it's not just whitespace
+  if (copiedText.length === 0) {
+    console.log('No text found in selection');
+    return;
+  }
+
+  if (isRepeatCapture(`text:${copiedText}`)) return;
+
+  console.log('Selection text captured:', copiedText.substring(0, 50) + '...');
+  enqueueCapture({ type: 'TEXT_COPIED', text: copiedText });
+}
+
+// Skip content that was already captured within the dedupe window
+function isRepeatCapture(key) {
+  const now = Date.now();
+  const isRepeat = lastCapture.key === key && now - lastCapture.time < DEDUPE_WINDOW_MS;
+  lastCapture = { key: key, time: now };
+  if (isRepeat) {
+    console.log('Duplicate capture skipped');
+  }
+  return isRepeat;
+}
+
+function readBlobAsDataUrl(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
+
+// Queue a captured entry for the next batch
+function enqueueCapture(entry) {
+  // Identical text still waiting to be sent only needs to be sent once
+  if (entry.type === 'TEXT_COPIED') {
+    captureQueue = captureQueue.filter(queued => queued.text !== entry.text);
+  }
+
+  captureQueue.push(entry);
+
+  if (captureQueue.length > MAX_QUEUE_LENGTH) {
+    const dropped = captureQueue.length - MAX_QUEUE_LENGTH;
+    captureQueue = captureQueue.slice(dropped);
+    console.log('Capture queue full, dropped oldest entries:', dropped);
+  }
+
+  scheduleFlush();
+}
+
+function scheduleFlush() {
+  if (flushTimer || inFlightBatch) return;
+  flushTimer = setTimeout(() => {
+    flushTimer = null;
+    flushCaptureQueue();
+  }, FLUSH_DELAY_MS);
+}
+
+// Send one batch at a time; the next batch waits for the background to ack
+function flushCaptureQueue() {
+  if (inFlightBatch || captureQueue.length === 0) return;
+
+  const port = getCapturePort();
+  if (!port) {
+    captureQueue = [];
+    return;
+  }
+
+  inFlightBatch = {
+    batchId: nextBatchId++,
+    entries: takeBatchEntries(),
+    attempts: 1
+  };
+  postBatch(port, inFlightBatch);
+}
+
+// Take queued entries up to the batch count and byte limits; an entry over
+// the byte limit on its own still goes out alone
+function takeBatchEntries() {
+  let count = 0;
+  let bytes = 0;
+  while (count < captureQueue.length && count < MAX_BATCH_SIZE) {
+    const entrySize = getEntrySize(captureQueue[count]);
+    if (count > 0 && bytes + entrySize > MAX_BATCH_BYTES) break;
+    bytes += entrySize;
+    count++;
+  }
+  return captureQueue.splice(0, count);
+}
+
+function getEntrySize(entry) {
+  return entry.type === 'IMAGE_COPIED' ? entry.imageData.length : entry.text.length;
+}
+
+function postBatch(port, batch) {
+  try {
+    port.postMessage({
+      type: 'CAPTURE_BATCH',
+      sessionId: captureSessionId,
+      batchId: batch.batchId,
+      entries: batch.entries
+    });
   } catch (error) {
-    console.error('Error capturing copy event:', error);
+    console.log('Capture batch send failed:', error.message);
+    // The port may still be connected; close it before retrying on a new one
+    try {
+      port.disconnect();
+    } catch (disconnectError) {
+      // Already disconnected
+    }
+    handlePortDisconnect();
+    return;
   }
+
+  clearTimeout(ackTimer);
+  ackTimer = setTimeout(handleAckTimeout, ACK_TIMEOUT_MS);
 }
 
-// Also listen for keyboard shortcuts
-document.addEventListener('keydown', async (event) => {
-  // Detect Ctrl+C (or Cmd+C on Mac)
-  if ((event.ctrlKey || event.metaKey) && event.key === 'c') {
-    console.log('Ctrl+C detected');
-    
-    // Check clipboard for images first
+// No ack and no disconnect: resend, or drop the batch so later captures aren't stuck behind it.
+// The background applies a batch ID once per session, so a resend is never applied twice.
+function handleAckTimeout() {
+  ackTimer = null;
+  const batch = inFlightBatch;
+  if (!batch) return;
+
+  if (batch.attempts >= MAX_SEND_ATTEMPTS || !capturePort) {
+    console.log('Capture batch dropped after ack timeout:', batch.batchId);
+    inFlightBatch = null;
+    scheduleFlush();
+    return;
+  }
+
+  batch.attempts++;
+  postBatch(capturePort, batch);
+}
+
+function getCapturePort() {
+  // The extension was reloaded or removed; this script can no longer talk to it
+  if (!chrome.runtime?.id) return null;
+
+  if (!capturePort) {
     try {
-      const clipboardItems = await navigator.clipboard.read();
-      for (const clipboardItem of clipboardItems) {
-        // Check for images first
-        for (const type of clipboardItem.types) {
-          if (type.startsWith('image/')) {
-            console.log('Image detected in clipboard via keyboard:', type);
-            const blob = await clipboardItem.getType(type);
-            const reader = new FileReader();
-            reader.onload = function(event) {
-              chrome.runtime.sendMessage({
-                type: 'IMAGE_COPIED',
-                imageData: event.target.result,
-                mimeType: type
-              }, () => {
-                // Don't wait for response
-                if (chrome.runtime.lastError) {
-                  console.log('Keyboard image message send failed:', chrome.runtime.lastError.message);
-                }
-              });
-            };
-            reader.readAsDataURL(blob);
-            return; // Exit early if image found
-          }
-        }
-      }
-    } catch (clipboardError) {
-      console.log('Keyboard: Clipboard API not available or failed:', clipboardError.message);
+      capturePort = chrome.runtime.connect({ name: CAPTURE_PORT_NAME });
+    } catch (error) {
+      console.log('Capture port connect failed:', error.message);
+      return null;
     }
-    
-    // Fallback to text detection
-    setTimeout(() => {
-      // Use selection method
-      const selection = window.getSelection();
-      const copiedText = selection.toString();
-      
-      if (copiedText && copiedText.trim().length > 0) {
-        console.log('Keyboard shortcut - Selection text captured:', copiedText.substring(0, 50) + '...');
-        chrome.runtime.sendMessage({
-          type: 'TEXT_COPIED',
-          text: copiedText.trim()
-        }, () => {
-          // Don't wait for response
-          if (chrome.runtime.lastError) {
-            console.log('Keyboard text message send failed:', chrome.runtime.lastError.message);
-          }
-        });
-      } else {
-        console.log('Keyboard shortcut - No text found in selection');
-      }
-    }, 100);
+    capturePort.onMessage.addListener(handlePortMessage);
+    capturePort.onDisconnect.addListener(handlePortDisconnect);
   }
-});
+
+  clearTimeout(portIdleTimer);
+  portIdleTimer = null;
+  return capturePort;
+}
+
+function handlePortMessage(message) {
+  if (message.type !== 'CAPTURE_ACK' || !inFlightBatch || message.batchId !== inFlightBatch.batchId) {
+    return;
+  }
+
+  inFlightBatch = null;
+  clearTimeout(ackTimer);
+  ackTimer = null;
+
+  if (captureQueue.length > 0) {
+    flushCaptureQueue();
+  } else {
+    portIdleTimer = setTimeout(releaseCapturePort, PORT_IDLE_TIMEOUT_MS);
+  }
+}
+
+// The service worker went away; resend the unacknowledged batch on a new port
+function handlePortDisconnect() {
+  if (chrome.runtime.lastError) {
+    console.log('Capture port disconnected:', chrome.runtime.lastError.message);
+  }
+
+  capturePort = null;
+  clearTimeout(portIdleTimer);
+  portIdleTimer = null;
+  clearTimeout(ackTimer);
+  ackTimer = null;
+
+  const batch = inFlightBatch;
+  inFlightBatch = null;
+  if (!batch) return;
+
+  if (batch.attempts >= MAX_SEND_ATTEMPTS) {
+    console.log('Capture batch dropped after retries:', batch.batchId);
+    scheduleFlush();
+    return;
+  }
+
+  const port = getCapturePort();
+  if (!port) {
+    captureQueue = [];
+    return;
+  }
+
+  batch.attempts++;
+  inFlightBatch = batch;
+  postBatch(port, batch);
+}
+
+function releaseCapturePort() {
+  portIdleTimer = null;
+  if (capturePort && !inFlightBatch && captureQueue.length === 0) {
+    capturePort.disconnect();
+    capturePort = null;
+  }
+}
@@ -0,0 +1,505 @@
+// Streaming export and import of clipboard history
+//
+// Archive format: newline-delimited JSON headers. Entries with a "bytes" field
+// are followed directly by that many raw bytes (image or compressed text data),
+// so binary data is never base64-encoded or held as one big string.
+//
+//   {"format":"sideclip-archive","version":1,...}
+//   {"kind":"item","item":{...}}
+//   {"kind":"image","id":"...","type":"image/jpeg",...,"bytes":1234}<1234 bytes>
+//   {"kind":"clipboard-png","id":"...","bytes":2345}<2345 bytes>  (read only)
+//   {"kind":"text","id":"...","length":5000,"bytes":321}<321 bytes>
+//   {"kind":"end","items":12}
+//
+// The clipboard PNG derived from a non-PNG image can be several times larger
+// than the original, so it is not exported; the side panel converts and stores
+// it again on the first paste. Older archives that include it still import.
+const ARCHIVE_FORMAT = 'sideclip-archive';
+const ARCHIVE_VERSION = 1;
+const ARCHIVE_MIME_TYPE = 'application/x-ndjson';
+const IMPORT_BATCH_SIZE = 10;
+const IMPORT_BATCH_BYTES = 8 * 1024 * 1024;
+const MAX_HEADER_LINE_BYTES = 1024 * 1024;
+
+class HistoryArchive {
+  constructor(imageDB) {
+    this.imageDB = imageDB;
+    this.encoder = new TextEncoder();
+  }
+
+  // Write every history item, one at a time, to a WritableStream
+  async exportTo(writable) {
+    const writer = writable.getWriter();
+    let itemCount = 0;
+
+    try {
+      await this.writeLine(writer, {
+        format: ARCHIVE_FORMAT,
+        version: ARCHIVE_VERSION,
+        exportedAt: new Date().toISOString()
+      });
+
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      const history = result.clipboardHistory || [];
+
+      for (const item of history) {
+        // Image data goes out as a binary entry, not as the inline data URL
+        const { dataUrl, ...record } = item;
+
+        if (item.type === 'image') {
+          const image = await this.loadImageForExport(item);
+          if (!image) {
+            console.warn('Skipping image without data:', item.id);
+            continue;
+          }
+          record.imageId = image.id;
+          await this.writeLine(writer, { kind: 'item', item: record });
+          await this.writeBinary(writer, {
+            kind: 'image',
+            id: image.id,
+            type: image.type,
+            url: image.url,
+            size: image.size,
+            width: image.width || 0,
+            height: image.height || 0,
+            animated: image.animated || false,
+            timestamp: image.timestamp
+          }, image.blob);
+        } else if (item.compressed) {
+          const text = await this.imageDB.getText(item.textId);
+          if (!text) {
+            console.warn('Skipping text without data:', item.id);
+            continue;
+          }
+          await this.writeLine(writer, { kind: 'item', item: record });
+          await this.writeBinary(writer, {
+            kind: 'text',
+            id: text.id,
+            length: text.length,
+            timestamp: text.timestamp
+          }, text.data);
+        } else {
+          await this.writeLine(writer, { kind: 'item', item: record });
+        }
+
+        itemCount++;
+      }
+
+      await this.writeLine(writer, { kind: 'end', items: itemCount });
+      await writer.close();
+    } catch (error) {
+      await writer.abort(error).catch(() => {});
+      throw error;
+    }
+
+    return itemCount;
+  }
+
+  // Get the stored image for a history item, falling back to its data URL
+  async loadImageForExport(item) {
+    if (item.imageId) {
+      const record = await this.imageDB.getImage(item.imageId);
+      if (record) return record;
+    }
+
+    if (!item.dataUrl) return null;
+
+    const blob = await (await fetch(item.dataUrl)).blob();
+    return {
+      id: item.imageId || item.id,
+      blob: blob,
+      type: blob.type,
+      url: item.url || '',
+      size: blob.size,
+      width: item.width,
+      height: item.height,
+      animated: item.animated,
+      timestamp: item.timestamp
+    };
+  }
+
+  async writeLine(writer, entry) {
+    await writer.write(this.encoder.encode(JSON.stringify(entry) + '\n'));
+  }
+
+  async writeBinary(writer, entry, blob) {
+    await this.writeLine(writer, { ...entry, bytes: blob.size });
+    await writer.write(blob);
+  }
+
+  // Read an archive stream and upsert its records in batched transactions.
+  // Binary entries are buffered until IMPORT_BATCH_SIZE records or
+  // IMPORT_BATCH_BYTES are pending, so memory use is bounded by one batch
+  // plus the entry being read, not by the size of the archive.
+  async importFrom(readable) {
+    const reader = new ArchiveReader(readable);
+    const header = await reader.readEntry();
+    if (!header || header.entry.format !== ARCHIVE_FORMAT) {
+      throw new Error('SideClip 백업 파일이 아닙니다');
+    }
+    if (header.entry.version > ARCHIVE_VERSION) {
+      throw new Error(`지원하지 않는 백업 버전입니다: ${header.entry.version}`);
+    }
+
+    const items = [];
+    const writtenImageIds = new Set();
+    const writtenTextIds = new Set();
+    let images = [];
+    let texts = [];
+    let pendingBytes = 0;
+
+    const flush = async () => {
+      if (images.length > 0) {
+        await this.imageDB.putRecords(this.imageDB.storeName, images);
+        images.forEach(record => writtenImageIds.add(record.id));
+        images = [];
+      }
+      if (texts.length > 0) {
+        await this.imageDB.putRecords(this.imageDB.textStoreName, texts);
+        texts.forEach(record => writtenTextIds.add(record.id));
+        texts = [];
+      }
+      pendingBytes = 0;
+    };
+
+    try {
+      let result;
+      while ((result = await reader.readEntry())) {
+        const { entry, blob } = result;
+
+        if (entry.kind === 'item') {
+          // Flush between items so an image and its clipboard PNG land in the same batch
+          if (images.length + texts.length >= IMPORT_BATCH_SIZE || pendingBytes >= IMPORT_BATCH_BYTES) {
+            await flush();
+          }
+          const item = sanitizeImportedItem(entry.item);
+          if (item) {
+            items.push(item);
+          } else {
+            console.warn('Skipping invalid item in backup');
+          }
+        } else if (entry.kind === 'image' && blob && isValidRecordId(entry.id)) {
+          // The blob type ends up in the data URL the side panel renders
+          const type = isImageMimeType(entry.type) ? entry.type : 'image/png';
+          images.push({
+            id: entry.id,
+            blob: new Blob([blob], { type: type }),
+            url: typeof entry.url === 'string' ? entry.url : '',
+            size: blob.size,
+            type: type,
+            width: isCount(entry.width) ? entry.width : 0,
+            height: isCount(entry.height) ? entry.height : 0,
+            animated: entry.animated === true,
+            timestamp: isTimestamp(entry.timestamp) ? entry.timestamp : new Date().toISOString()
+          });
+          pendingBytes += blob.size;
+        } else if (entry.kind === 'clipboard-png' && blob) {
+          const image = images.find(record => record.id === entry.id);
+          if (image) {
+            image.clipboardBlob = new Blob([blob], { type: 'image/png' });
+            pendingBytes += blob.size;
+          }
+        } else if (entry.kind === 'text' && blob && isValidRecordId(entry.id)) {
+          texts.push({
+            id: entry.id,
+            data: blob,
+            length: isCount(entry.length) ? entry.length : 0,
+            timestamp: isTimestamp(entry.timestamp) ? entry.timestamp : new Date().toISOString()
+          });
+          pendingBytes += blob.size;
+        } else if (entry.kind === 'end') {
+          break;
+        }
+      }
+      await flush();
+
+      const importedItems = await this.filterItemsWithData(items, writtenImageIds, writtenTextIds);
+      await this.mergeHistory(importedItems);
+      return importedItems.length;
+    } finally {
+      // Records without a kept item would otherwise stay until Clear All
+      await this.deleteUnreferencedRecords(writtenImageIds, writtenTextIds);
+    }
+  }
+
+  // Keep only items whose image or text record was imported or is already stored
+  async filterItemsWithData(items, importedImageIds, importedTextIds) {
+    const kept = [];
+    for (const item of items) {
+      let hasData = true;
+      if (item.type === 'image') {
+        hasData = importedImageIds.has(item.imageId) || !!(await this.imageDB.getImage(item.imageId));
+      } else if (item.compressed) {
+        hasData = importedTextIds.has(item.textId) || !!(await this.imageDB.getText(item.textId));
+      }
+
+      if (hasData) {
+        kept.push(item);
+      } else {
+        console.warn('Skipping item without data:', item.id);
+      }
+    }
+    return kept;
+  }
+
+  // Remove records written by an import that no history item refers to
+  async deleteUnreferencedRecords(imageIds, textIds) {
+    try {
+      const result = await chrome.storage.local.get(['clipboardHistory']);
+      const history = result.clipboardHistory || [];
+      const referencedImageIds = new Set(history.map(item => item.imageId).filter(Boolean));
+      const referencedTextIds = new Set(history.map(item => item.textId).filter(Boolean));
+
+      for (const id of imageIds) {
+        if (!referencedImageIds.has(id)) {
+          await this.imageDB.deleteImage(id);
+        }
+      }
+      await this.imageDB.deleteTexts(Array.from(textIds).filter(id => !referencedTextIds.has(id)));
+    } catch (error) {
+      console.error('Error cleaning up failed import:', error);
+    }
+  }
+
+  // Upsert imported items into history by ID, newest first, within the history limit
+  async mergeHistory(importedItems) {
+    const result = await chrome.storage.local.get(['clipboardHistory']);
+    const merged = new Map((result.clipboardHistory || []).map(item => [item.id, item]));
+    const replaced = [];
+
+    for (const item of importedItems) {
+      if (merged.has(item.id)) {
+        replaced.push(merged.get(item.id));
+      }
+      merged.set(item.id, item);
+    }
+
+    const sorted = Array.from(merged.values())
+      .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+    const history = sorted.slice(0, 50);
+    const dropped = sorted.slice(50).concat(replaced);
+
+    // History items show images from an inline data URL; rebuild them one at a time
+    // from the stored record, which is also the only trusted source for the size and type
+    for (const item of history) {
+      if (item.type === 'image' && !item.dataUrl && item.imageId) {
+        const record = await this.imageDB.getImage(item.imageId);
+        if (record) {
+          item.dataUrl = await readBlobAsDataUrl(record.blob);
+          item.mimeType = record.type;
+          item.size = formatArchiveSize(record.blob.size);
+          item.originalSize = record.blob.size;
+        }
+      }
+    }
+
+    await chrome.storage.local.set({ clipboardHistory: history });
+
+    // Imported records that didn't make it into history would never be cleaned up
+    const keptImageIds = new Set(history.map(item => item.imageId).filter(Boolean));
+    const keptTextIds = new Set(history.map(item => item.textId).filter(Boolean));
+    const droppedImageIds = new Set(dropped
+      .filter(item => item.imageId && !keptImageIds.has(item.imageId))
+      .map(item => item.imageId));
+    for (const imageId of droppedImageIds) {
+      await this.imageDB.deleteImage(imageId);
+    }
+    await this.imageDB.deleteTexts(dropped
+      .filter(item => item.compressed && !keptTextIds.has(item.textId))
+      .map(item => item.textId));
+  }
+}
+
+// Rebuild an imported history item from known fields only. Backups can come
+// from anywhere, and the side panel renders some of these fields as HTML, so
+// anything unexpected is dropped. The data URL, size and MIME type come from
+// the image record instead.
+function sanitizeImportedItem(raw) {
+  if (!raw || typeof raw !== 'object') return null;
+  if (!isValidRecordId(raw.id) || !isTimestamp(raw.timestamp)) return null;
+
+  const item = {
+    id: raw.id,
+    type: raw.type,
+    timestamp: raw.timestamp,
+    preview: typeof raw.preview === 'string' ? raw.preview : ''
+  };
+
+  if (raw.type === 'image') {
+    if (!isValidRecordId(raw.imageId)) return null;
+    item.imageId = raw.imageId;
+    item.url = typeof raw.url === 'string' ? raw.url : '';
+    item.width = isCount(raw.width) ? raw.width : 0;
+    item.height = isCount(raw.height) ? raw.height : 0;
+    item.animated = raw.animated === true;
+    return item;
+  }
+
+  if (raw.type !== 'text') return null;
+
+  if (raw.textId !== undefined) {
+    if (!isValidRecordId(raw.textId) || !/^[0-9a-f]{64}$/.test(raw.textHash) || !isCount(raw.textLength)) {
+      return null;
+    }
+    item.compressed = true;
+    item.textId = raw.textId;
+    item.textHash = raw.textHash;
+    item.textLength = raw.textLength;
+    return item;
+  }
+
+  if (typeof raw.text !== 'string') return null;
+  item.text = raw.text;
+  return item;
+}
+
+function isValidRecordId(id) {
+  return typeof id === 'string' && /^[\w-]{1,64}$/.test(id);
+}
+
+function isTimestamp(value) {
+  return typeof value === 'string' && !isNaN(Date.parse(value));
+}
+
+function isCount(value) {
+  return Number.isInteger(value) && value >= 0;
+}
+
+function isImageMimeType(value) {
+  return typeof value === 'string' && /^image\/[\w.+-]+$/.test(value);
+}
+
+function formatArchiveSize(bytes) {
+  if (bytes === 0) return '0 Bytes';
+  const k = 1024;
+  const sizes = ['Bytes', 'KB', 'MB', 'GB'];
+  const i = Math.floor(Math.log(bytes) / Math.log(k));
+  return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
+}
+
+// Incremental parser for the archive format; buffers only the entry being read
+class ArchiveReader {
+  constructor(readable) {
+    this.reader = readable.getReader();
+    this.chunks = [];
+    this.buffered = 0;
+    this.done = false;
+    this.scanned = 0; // Buffered bytes already known to hold no newline
+    this.decoder = new TextDecoder();
+  }
+
+  // Read the next header line and its binary data, or null at end of stream
+  async readEntry() {
+    const line = await this.readLine();
+    if (line === null) return null;
+    if (line.trim() === '') return this.readEntry();
+
+    const entry = JSON.parse(line);
+    if (typeof entry.bytes !== 'number') {
+      return { entry: entry, blob: null };
+    }
+
+    const parts = await this.readBytes(entry.bytes);
+    return { entry: entry, blob: new Blob(parts) };
+  }
+
+  async readLine() {
+    while (true) {
+      const newline = this.findNewline();
+      if (newline !== -1) {
+        const lineParts = this.take(newline);
+        this.take(1); // Newline
+        return this.decoder.decode(concatChunks(lineParts));
+      }
+      // A file that is not an archive may have no newline at all; don't buffer all of it
+      if (this.buffered > MAX_HEADER_LINE_BYTES) {
+        throw new Error('백업 파일이 손상되었습니다');
+      }
+      if (this.done) {
+        return this.buffered > 0 ? this.decoder.decode(concatChunks(this.take(this.buffered))) : null;
+      }
+      await this.pull();
+    }
+  }
+
+  async readBytes(count) {
+    while (this.buffered < count && !this.done) {
+      await this.pull();
+    }
+    if (this.buffered < count) {
+      throw new Error('백업 파일이 손상되었습니다');
+    }
+    return this.take(count);
+  }
+
+  // Only bytes pulled since the last search are scanned
+  findNewline() {
+    let offset = 0;
+    for (const chunk of this.chunks) {
+      if (offset + chunk.length > this.scanned) {
+        const index = chunk.indexOf(0x0A, Math.max(0, this.scanned - offset));
+        if (index !== -1) return offset + index;
+      }
+      offset += chunk.length;
+    }
+    this.scanned = offset;
+    return -1;
+  }
+
+  // Remove the first count bytes from the buffer without copying whole chunks
+  take(count) {
+    const parts = [];
+    this.scanned = Math.max(0, this.scanned - count);
+    while (count > 0) {
+      const chunk = this.chunks[0];
+      if (chunk.length <= count) {
+        parts.push(chunk);
+        this.chunks.shift();
+        count -= chunk.length;
+        this.buffered -= chunk.length;
+      } else {
+        parts.push(chunk.subarray(0, count));
+        this.chunks[0] = chunk.subarray(count);
+        this.buffered -= count;
+        count = 0;
+      }
+    }
+    return parts;
+  }
+
+  async pull() {
+    const { done, value } = await this.reader.read();
+    if (done) {
+      this.done = true;
+    } else if (value.length > 0) {
+      this.chunks.push(value);
+      this.buffered += value.length;
+    }
+  }
+}
+
+function concatChunks(parts) {
+  if (parts.length === 1) return parts[0];
+  const total = parts.reduce((sum, part) => sum + part.length, 0);
+  const joined = new Uint8Array(total);
+  let offset = 0;
+  for (const part of parts) {
+    joined.set(part, offset);
+    offset += part.length;
+  }
+  return joined;
+}
+
+function readBlobAsDataUrl(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
+
+// Export for use in other files
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = { HistoryArchive, ArchiveReader };
+}
@@ -2,8 +2,9 @@
 class ClipboardImageDB {
   constructor() {
     this.dbName = 'SideClipDB';
-    this.version = 1;
+    this.version = 2;
     this.storeName = 'images';
+    this.textStoreName = 'texts';
     this.db = null;
   }
 
@@ -19,6 +20,11 @@ class ClipboardImageDB {
 
       request.onsuccess = () => {
         this.db = request.result;
+        // Let a newer version (e.g. after an extension update) take over
+        this.db.onversionchange = () => {
+          this.db.close();
+          this.db = null;
+        };
         console.log('IndexedDB initialized successfully');
         resolve(this.db);
       };
@@ -32,6 +38,12 @@ class ClipboardImageDB {
           store.createIndex('timestamp', 'timestamp', { unique: false });
           console.log('Created images object store');
         }
+
+        // Create object store for compressed large texts if it doesn't exist
+        if (!db.objectStoreNames.contains(this.textStoreName)) {
+          db.createObjectStore(this.textStoreName, { keyPath: 'id' });
+          console.log('Created texts object store');
+        }
       };
     });
   }
@@ -54,6 +66,9 @@ class ClipboardImageDB {
           url: imageData.url || '',
           size: imageData.size || 0,
           type: imageData.type || 'image/png',
+          width: imageData.width || 0,
+          height: imageData.height || 0,
+          animated: imageData.animated || false,
           timestamp: new Date().toISOString()
         };
 
@@ -108,6 +123,71 @@ class ClipboardImageDB {
     });
   }
 
+  // Get image by ID
+  async getImage(id) {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.storeName], 'readonly');
+      const store = transaction.objectStore(this.storeName);
+      const request = store.get(id);
+
+      request.onsuccess = () => {
+        resolve(request.result || null);
+      };
+
+      request.onerror = () => {
+        console.error('Error getting image:', request.error);
+        reject(request.error);
+      };
+    });
+  }
+
+  // Attach a clipboard-ready PNG to an existing image record
+  async storeClipboardBlob(id, pngBlob) {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.storeName], 'readwrite');
+      const store = transaction.objectStore(this.storeName);
+      const request = store.get(id);
+
+      request.onsuccess = () => {
+        const record = request.result;
+        if (!record) {
+          resolve(false);
+          return;
+        }
+        record.clipboardBlob = pngBlob;
+        store.put(record);
+      };
+
+      transaction.oncomplete = () => {
+        resolve(true);
+      };
+
+      transaction.onerror = () => {
+        console.error('Error storing clipboard blob:', transaction.error);
+        reject(transaction.error);
+      };
+    });
+  }
+
+  // Get a PNG blob ready for the clipboard, or null if none is stored
+  async getClipboardBlob(id) {
+    const record = await this.getImage(id);
+    if (!record) return null;
+
+    if (record.clipboardBlob) return record.clipboardBlob;
+
+    // PNG originals are stored as-is
+    if (record.type === 'image/png' && record.blob) {
+      return record.blob.type === 'image/png' ? record.blob : new Blob([record.blob], { type: 'image/png' });
+    }
+
+    return null;
+  }
+
   // Get all images
   async getAllImages() {
     if (!this.db) await this.init();
@@ -170,6 +250,138 @@ class ClipboardImageDB {
     });
   }
 
+  // Store compressed text
+  async storeText(textData) {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.textStoreName], 'readwrite');
+      const store = transaction.objectStore(this.textStoreName);
+
+      const textRecord = {
+        id: textData.id,
+        data: textData.data,
+        length: textData.length || 0,
+        timestamp: new Date().toISOString()
+      };
+
+      store.put(textRecord);
+
+      transaction.oncomplete = () => {
+        resolve(textRecord);
+      };
+
+      transaction.onerror = () => {
+        console.error('Error storing text:', transaction.error);
+        reject(transaction.error);
+      };
+    });
+  }
+
+  // Get compressed text by ID
+  async getText(id) {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.textStoreName], 'readonly');
+      const store = transaction.objectStore(this.textStoreName);
+      const request = store.get(id);
+
+      request.onsuccess = () => {
+        resolve(request.result || null);
+      };
+
+      request.onerror = () => {
+        console.error('Error getting text:', request.error);
+        reject(request.error);
+      };
+    });
+  }
+
+  // Get the IDs of all stored compressed texts without reading their data
+  async getAllTextIds() {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.textStoreName], 'readonly');
+      const store = transaction.objectStore(this.textStoreName);
+      const request = store.getAllKeys();
+
+      request.onsuccess = () => {
+        resolve(request.result);
+      };
+
+      request.onerror = () => {
+        console.error('Error getting text IDs:', request.error);
+        reject(request.error);
+      };
+    });
+  }
+
+  // Delete compressed texts by ID in one transaction
+  async deleteTexts(ids) {
+    if (!this.db) await this.init();
+    if (ids.length === 0) return;
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.textStoreName], 'readwrite');
+      const store = transaction.objectStore(this.textStoreName);
+      ids.forEach(id => store.delete(id));
+
+      transaction.oncomplete = () => {
+        console.log('Texts deleted successfully:', ids.length);
+        resolve();
+      };
+
+      transaction.onerror = () => {
+        console.error('Error deleting texts:', transaction.error);
+        reject(transaction.error);
+      };
+    });
+  }
+
+  // Clear all compressed texts
+  async clearAllTexts() {
+    if (!this.db) await this.init();
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([this.textStoreName], 'readwrite');
+      const store = transaction.objectStore(this.textStoreName);
+      const request = store.clear();
+
+      request.onsuccess = () => {
+        console.log('All texts cleared successfully');
+        resolve();
+      };
+
+      request.onerror = () => {
+        console.error('Error clearing texts:', request.error);
+        reject(request.error);
+      };
+    });
+  }
+
+  // Upsert records into a store in one transaction
+  async putRecords(storeName, records) {
+    if (!this.db) await this.init();
+    if (records.length === 0) return;
+    
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([storeName], 'readwrite');
+      const store = transaction.objectStore(storeName);
+      records.forEach(record => store.put(record));
+
+      transaction.oncomplete = () => {
+        resolve();
+      };
+
+      transaction.onerror = () => {
+        console.error(`Error writing records to ${storeName}:`, transaction.error);
+        reject(transaction.error);
+      };
+    });
+  }
+
   // Get storage usage
   async getStorageUsage() {
     if (!navigator.storage || !navigator.storage.estimate) {
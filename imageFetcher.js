@@ -0,0 +1,163 @@
+// Bounded image fetcher for the background service worker
+class ImageFetcher {
+  constructor(options = {}) {
+    this.maxBytes = options.maxBytes || 5 * 1024 * 1024; // 5MB
+    this.timeoutMs = options.timeoutMs || 15000;
+    this.maxConcurrent = options.maxConcurrent || 3;
+    this.cacheSize = options.cacheSize || 20;
+    // Injectable so the fetcher can be exercised against a local stand-in server
+    this.fetchImpl = options.fetch || ((url, init) => fetch(url, init));
+
+    this.inFlight = new Map();     // url -> pending download promise
+    this.recentImages = new Map(); // url -> stored image ID, oldest first
+    this.activeCount = 0;
+    this.waitQueue = [];
+  }
+
+  // Download an image, sharing the request with any identical one in flight
+  fetch(url) {
+    if (this.inFlight.has(url)) {
+      console.log('Joining in-flight image download:', url);
+      return this.inFlight.get(url);
+    }
+
+    const request = this.runWithSlot(() => this.download(url)).finally(() => {
+      this.inFlight.delete(url);
+    });
+    this.inFlight.set(url, request);
+    return request;
+  }
+
+  // Look up the stored image ID for a recently fetched URL
+  getRecentImageId(url) {
+    if (!this.recentImages.has(url)) return null;
+
+    // Refresh recency
+    const imageId = this.recentImages.get(url);
+    this.recentImages.delete(url);
+    this.recentImages.set(url, imageId);
+    return imageId;
+  }
+
+  // Remember which stored image a URL was saved as
+  rememberImage(url, imageId) {
+    if (!url || !imageId) return;
+
+    this.recentImages.delete(url);
+    this.recentImages.set(url, imageId);
+
+    while (this.recentImages.size > this.cacheSize) {
+      const oldestUrl = this.recentImages.keys().next().value;
+      this.recentImages.delete(oldestUrl);
+    }
+  }
+
+  // Drop cache entries for images that no longer exist
+  forgetImage(imageId) {
+    for (const [url, cachedId] of this.recentImages) {
+      if (cachedId === imageId) {
+        this.recentImages.delete(url);
+      }
+    }
+  }
+
+  clearRecentImages() {
+    this.recentImages.clear();
+  }
+
+  // Limit the number of downloads running at once
+  async runWithSlot(task) {
+    if (this.activeCount >= this.maxConcurrent) {
+      await new Promise(resolve => this.waitQueue.push(resolve));
+    }
+
+    this.activeCount++;
+    try {
+      return await task();
+    } finally {
+      this.activeCount--;
+      const next = this.waitQueue.shift();
+      if (next) next();
+    }
+  }
+
+  async download(url) {
+    const controller = new AbortController();
+    let timedOut = false;
+    const timer = setTimeout(() => {
+      timedOut = true;
+      controller.abort();
+    }, this.timeoutMs);
+
+    try {
+      const response = await this.fetchImpl(url, { method: 'GET', signal: controller.signal });
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const type = (response.headers.get('Content-Type') || '').split(';')[0].trim();
+
+      // Reject before reading the body when the server announces a huge image
+      const contentLength = Number(response.headers.get('Content-Length'));
+      if (contentLength > this.maxBytes) {
+        controller.abort();
+        throw this.tooLargeError(contentLength);
+      }
+
+      const chunks = [];
+      let received = 0;
+
+      if (response.body) {
+        // Content-Length can be missing or wrong, so keep a running byte cap
+        const reader = response.body.getReader();
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+
+          received += value.byteLength;
+          if (received > this.maxBytes) {
+            controller.abort();
+            throw this.tooLargeError(received);
+          }
+          chunks.push(value);
+        }
+      } else {
+        const body = await response.blob();
+        received = body.size;
+        if (received > this.maxBytes) {
+          throw this.tooLargeError(received);
+        }
+        chunks.push(body);
+      }
+
+      const blob = new Blob(chunks, { type: type });
+      console.log('Image downloaded:', url, received + ' bytes');
+
+      return {
+        blob: blob,
+        size: blob.size,
+        type: blob.type,
+        url: url
+      };
+    } catch (error) {
+      if (timedOut) {
+        throw new Error(`Image download timed out after ${this.timeoutMs}ms`);
+      }
+      throw error;
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
+  tooLargeError(size) {
+    const error = new Error(`Image too large: ${size} bytes (limit ${this.maxBytes})`);
+    error.tooLarge = true;
+    return error;
+  }
+}
+
+// Export for use in other files
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = ImageFetcher;
+}
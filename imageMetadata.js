@@ -0,0 +1,275 @@
+// Image metadata extraction from file headers, without decoding the image
+const IMAGE_HEADER_BYTES = 64 * 1024;
+const JPEG_MAX_SEGMENTS = 64;
+
+// Read dimensions, MIME type and animation flag from the start of an image blob.
+// Returns null when the format is not recognized or the header is truncated.
+async function readImageMetadata(blob) {
+  const header = new Uint8Array(await blob.slice(0, IMAGE_HEADER_BYTES).arrayBuffer());
+
+  try {
+    if (matchesBytes(header, 0, [0x89, 0x50, 0x4E, 0x47, 0x0D, 0x0A, 0x1A, 0x0A])) {
+      return parsePngHeader(header);
+    }
+    if (matchesBytes(header, 0, [0xFF, 0xD8, 0xFF])) {
+      return await parseJpegHeader(blob, header);
+    }
+    if (matchesAscii(header, 0, 'GIF87a') || matchesAscii(header, 0, 'GIF89a')) {
+      return parseGifHeader(header);
+    }
+    if (matchesAscii(header, 0, 'RIFF') && matchesAscii(header, 8, 'WEBP')) {
+      return parseWebpHeader(header);
+    }
+    if (matchesAscii(header, 0, 'BM')) {
+      return parseBmpHeader(header);
+    }
+  } catch (error) {
+    // Truncated or malformed header; fall through to unknown
+    console.log('Could not read image header:', error.message);
+  }
+
+  return null;
+}
+
+// PNG: IHDR is always the first chunk; an acTL chunk before IDAT marks APNG
+function parsePngHeader(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  if (!matchesAscii(bytes, 12, 'IHDR')) return null;
+
+  let animated = false;
+  let offset = 8;
+  while (offset + 8 <= bytes.length) {
+    const length = view.getUint32(offset);
+    if (matchesAscii(bytes, offset + 4, 'acTL')) {
+      animated = true;
+      break;
+    }
+    if (matchesAscii(bytes, offset + 4, 'IDAT')) break;
+    offset += 12 + length;
+  }
+
+  return {
+    width: view.getUint32(16),
+    height: view.getUint32(20),
+    mimeType: 'image/png',
+    animated: animated
+  };
+}
+
+// JPEG: walk marker segments until a start-of-frame marker.
+// EXIF data can push SOF past the header window, so later segments are read on demand.
+// SOF holds the stored size; browsers display it rotated by the EXIF orientation.
+async function parseJpegHeader(blob, header) {
+  let offset = 2;
+  let orientation = 1;
+
+  for (let i = 0; i < JPEG_MAX_SEGMENTS && offset < blob.size; i++) {
+    const segment = offset + 9 <= header.length
+      ? header.subarray(offset, offset + 9)
+      : new Uint8Array(await blob.slice(offset, offset + 9).arrayBuffer());
+
+    if (segment.length < 4 || segment[0] !== 0xFF) return null;
+
+    const marker = segment[1];
+
+    // Fill bytes and standalone markers carry no length
+    if (marker === 0xFF) {
+      offset += 1;
+      continue;
+    }
+    if (marker === 0x01 || (marker >= 0xD0 && marker <= 0xD8)) {
+      offset += 2;
+      continue;
+    }
+
+    // SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+    if (marker >= 0xC0 && marker <= 0xCF && marker !== 0xC4 && marker !== 0xC8 && marker !== 0xCC) {
+      if (segment.length < 9) return null;
+      const width = (segment[7] << 8) | segment[8];
+      const height = (segment[5] << 8) | segment[6];
+      const rotated = orientation >= 5 && orientation <= 8; // 90 or 270 degrees
+      return {
+        width: rotated ? height : width,
+        height: rotated ? width : height,
+        mimeType: 'image/jpeg',
+        animated: false
+      };
+    }
+
+    // Start of scan or end of image without a frame header
+    if (marker === 0xDA || marker === 0xD9) return null;
+
+    const length = (segment[2] << 8) | segment[3];
+
+    // APP1 carries EXIF, which always comes before SOF
+    if (marker === 0xE1 && orientation === 1) {
+      const data = offset + 2 + length <= header.length
+        ? header.subarray(offset + 4, offset + 2 + length)
+        : new Uint8Array(await blob.slice(offset + 4, offset + 2 + length).arrayBuffer());
+      orientation = readExifOrientation(data);
+    }
+
+    offset += 2 + length;
+  }
+
+  return null;
+}
+
+// EXIF: TIFF header, then the Orientation tag (0x0112) in IFD0. Returns 1 (upright)
+// when the segment is not EXIF or is malformed, so bad EXIF never hides the size.
+function readExifOrientation(data) {
+  if (!matchesAscii(data, 0, 'Exif\0\0') || data.length < 14) return 1;
+
+  const tiff = 6;
+  const littleEndian = matchesAscii(data, tiff, 'II');
+  if (!littleEndian && !matchesAscii(data, tiff, 'MM')) return 1;
+
+  const view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+  const ifd = tiff + view.getUint32(tiff + 4, littleEndian);
+  if (ifd + 2 > data.length) return 1;
+
+  const count = view.getUint16(ifd, littleEndian);
+  for (let i = 0; i < count; i++) {
+    const entry = ifd + 2 + i * 12;
+    if (entry + 12 > data.length) break;
+    if (view.getUint16(entry, littleEndian) === 0x0112) {
+      const orientation = view.getUint16(entry + 8, littleEndian);
+      return orientation >= 1 && orientation <= 8 ? orientation : 1;
+    }
+  }
+
+  return 1;
+}
+
+// GIF: logical screen descriptor, then count image descriptors in the header window
+function parseGifHeader(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const width = view.getUint16(6, true);
+  const height = view.getUint16(8, true);
+
+  let animated = false;
+  let frames = 0;
+  let offset = 13;
+
+  const packed = bytes[10];
+  if (packed & 0x80) {
+    offset += 3 * (1 << ((packed & 0x07) + 1));
+  }
+
+  const skipSubBlocks = (position) => {
+    while (position < bytes.length && bytes[position] !== 0) {
+      position += bytes[position] + 1;
+    }
+    return position + 1;
+  };
+
+  while (offset < bytes.length && !animated) {
+    const block = bytes[offset];
+
+    if (block === 0x21) {
+      // Extension block; NETSCAPE2.0 is the looping animation extension
+      if (bytes[offset + 1] === 0xFF && matchesAscii(bytes, offset + 3, 'NETSCAPE2.0')) {
+        animated = true;
+      }
+      offset = skipSubBlocks(offset + 2);
+    } else if (block === 0x2C) {
+      // Image descriptor, optional local color table, LZW code size, image data
+      frames++;
+      if (frames > 1) {
+        animated = true;
+      }
+      const localPacked = bytes[offset + 9];
+      offset += 10;
+      if (localPacked & 0x80) {
+        offset += 3 * (1 << ((localPacked & 0x07) + 1));
+      }
+      offset = skipSubBlocks(offset + 1);
+    } else {
+      break; // Trailer or unknown block
+    }
+  }
+
+  return {
+    width: width,
+    height: height,
+    mimeType: 'image/gif',
+    animated: animated
+  };
+}
+
+// WebP: lossy (VP8), lossless (VP8L) or extended (VP8X) first chunk
+function parseWebpHeader(bytes) {
+  if (matchesAscii(bytes, 12, 'VP8 ')) {
+    // Key frame start code follows the 3-byte frame tag
+    if (bytes.length < 30 || !matchesBytes(bytes, 23, [0x9D, 0x01, 0x2A])) return null;
+    return {
+      width: ((bytes[27] << 8) | bytes[26]) & 0x3FFF,
+      height: ((bytes[29] << 8) | bytes[28]) & 0x3FFF,
+      mimeType: 'image/webp',
+      animated: false
+    };
+  }
+
+  if (matchesAscii(bytes, 12, 'VP8L')) {
+    if (bytes.length < 25 || bytes[20] !== 0x2F) return null;
+    const b0 = bytes[21], b1 = bytes[22], b2 = bytes[23], b3 = bytes[24];
+    return {
+      width: 1 + (b0 | ((b1 & 0x3F) << 8)),
+      height: 1 + ((b1 >> 6) | (b2 << 2) | ((b3 & 0x0F) << 10)),
+      mimeType: 'image/webp',
+      animated: false
+    };
+  }
+
+  if (matchesAscii(bytes, 12, 'VP8X')) {
+    if (bytes.length < 30) return null;
+    return {
+      width: 1 + (bytes[24] | (bytes[25] << 8) | (bytes[26] << 16)),
+      height: 1 + (bytes[27] | (bytes[28] << 8) | (bytes[29] << 16)),
+      mimeType: 'image/webp',
+      animated: (bytes[20] & 0x02) !== 0
+    };
+  }
+
+  return null;
+}
+
+// BMP: OS/2 core header uses 16-bit sizes, newer headers signed 32-bit
+function parseBmpHeader(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const dibHeaderSize = view.getUint32(14, true);
+
+  if (dibHeaderSize === 12) {
+    return {
+      width: view.getUint16(18, true),
+      height: view.getUint16(20, true),
+      mimeType: 'image/bmp',
+      animated: false
+    };
+  }
+
+  return {
+    width: Math.abs(view.getInt32(18, true)),
+    height: Math.abs(view.getInt32(22, true)), // Negative height means top-down rows
+    mimeType: 'image/bmp',
+    animated: false
+  };
+}
+
+function matchesBytes(bytes, offset, expected) {
+  if (offset + expected.length > bytes.length) return false;
+  return expected.every((value, i) => bytes[offset + i] === value);
+}
+
+function matchesAscii(bytes, offset, text) {
+  if (offset + text.length > bytes.length) return false;
+  for (let i = 0; i < text.length; i++) {
+    if (bytes[offset + i] !== text.charCodeAt(i)) return false;
+  }
+  return true;
+}
+
+// Export for use in other files
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = { readImageMetadata };
+}
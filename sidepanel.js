@@ -10,6 +10,13 @@ const confirmDialog = document.getElementById('confirmDialog');
 const confirmClearBtn = document.getElementById('confirmClearBtn');
 const cancelClearBtn = document.getElementById('cancelClearBtn');
 const notification = document.getElementById('notification');
+const exportBtn = document.getElementById('exportBtn');
+const importBtn = document.getElementById('importBtn');
+const importInput = document.getElementById('importInput');
+
+// Shared IndexedDB access for stored image blobs and compressed texts
+const imageDB = new ClipboardImageDB();
+const historyArchive = new HistoryArchive(imageDB);
 
 // Load clipboard history when panel opens
 document.addEventListener('DOMContentLoaded', loadClipboardHistory);
@@ -18,6 +25,9 @@ document.addEventListener('DOMContentLoaded', loadClipboardHistory);
 clearAllBtn.addEventListener('click', showClearAllDialog);
 confirmClearBtn.addEventListener('click', clearAllHistory);
 cancelClearBtn.addEventListener('click', hideClearAllDialog);
+exportBtn.addEventListener('click', exportHistory);
+importBtn.addEventListener('click', () => importInput.click());
+importInput.addEventListener('change', importHistory);
 
 // Load and display clipboard history
 async function loadClipboardHistory() {
@@ -103,13 +113,13 @@ function createHistoryItem(item, index) {
             <div class="item-content">
                 <div class="image-content">
                     <div class="image-thumbnail-container">
-                        <img src="${item.dataUrl}" alt="Copied image" class="image-thumbnail" />
+                        <img alt="Copied image" class="image-thumbnail" decoding="async" />
                         <div class="image-overlay">
                             <span class="image-type-indicator">🖼️</span>
                         </div>
                     </div>
                     <div class="image-info">
-                        <div class="item-text" id="size-${item.id}">${item.size || 'Loading...'}</div>
+                        <div class="item-text" id="size-${item.id}">${escapeHtml(item.size || 'Loading...')}</div>
                         <div class="item-timestamp">${timeAgo}</div>
                         <div class="image-dimensions" id="dimensions-${item.id}"></div>
                     </div>
@@ -118,15 +128,24 @@ function createHistoryItem(item, index) {
             <button class="delete-btn" title="Delete this item">×</button>
         `;
         
+        // Set through the DOM so the data URL is never parsed as HTML
+        li.querySelector('.image-thumbnail').src = item.dataUrl;
+        
         // Add click handler for copying image
         const itemContent = li.querySelector('.item-content');
         itemContent.addEventListener('click', () => copyImageToClipboard(item));
         
-        // Update image info when loaded
-        const img = li.querySelector('img');
-        img.onload = function() {
-            updateImageInfo(this, item);
-        };
+        // Dimensions are captured from the image header; only older items
+        // without them need to wait for the thumbnail to decode
+        const dimensionsElement = li.querySelector('.image-dimensions');
+        if (item.width > 0 && item.height > 0) {
+            dimensionsElement.textContent = formatDimensions(item.width, item.height, item.animated);
+        } else {
+            const img = li.querySelector('img');
+            img.onload = function() {
+                updateImageInfo(this, item);
+            };
+        }
     } else {
         // Create text item
         li.innerHTML = `
@@ -142,7 +161,13 @@ function createHistoryItem(item, index) {
         
         // Add click handler for copying text
         const itemContent = li.querySelector('.item-content');
-        itemContent.addEventListener('click', () => copyTextToClipboard(item.text));
+        itemContent.addEventListener('click', () => {
+            if (item.compressed) {
+                copyCompressedTextToClipboard(item);
+            } else {
+                copyTextToClipboard(item.text);
+            }
+        });
     }
     
     // Add click handler for delete button
@@ -167,14 +192,19 @@ function updateImageInfo(imgElement, item) {
         }
         
         if (dimensionsElement) {
-            const dimensions = `${imgElement.naturalWidth} × ${imgElement.naturalHeight}`;
-            dimensionsElement.textContent = dimensions;
+            dimensionsElement.textContent = formatDimensions(imgElement.naturalWidth, imgElement.naturalHeight);
         }
     } catch (error) {
         console.error('Error updating image info:', error);
     }
 }
 
+// Format image dimensions
+function formatDimensions(width, height, animated = false) {
+    const dimensions = `${width} × ${height}`;
+    return animated ? `${dimensions} · 애니메이션` : dimensions;
+}
+
 // Format file size
 function formatFileSize(bytes) {
     if (!bytes || bytes === 0) return 'Unknown size';
@@ -209,6 +239,41 @@ async function copyTextToClipboard(text) {
     }
 }
 
+// Copy a large text stored compressed in IndexedDB
+async function copyCompressedTextToClipboard(item) {
+    const textPromise = loadItemText(item);
+    try {
+        // Passing a promise keeps the write inside the click's user activation
+        const clipboardItem = new ClipboardItem({
+            'text/plain': textPromise.then(text => new Blob([text], { type: 'text/plain' }))
+        });
+        await navigator.clipboard.write([clipboardItem]);
+        showNotification('텍스트가 클립보드에 복사되었습니다!');
+    } catch (error) {
+        console.error('Error copying compressed text to clipboard:', error);
+        try {
+            await copyTextToClipboard(await textPromise);
+        } catch (loadError) {
+            console.error('Error loading compressed text:', loadError);
+            showNotification('복사 실패', 'error');
+        }
+    }
+}
+
+// Get the full text of a history item, decompressing it if needed
+async function loadItemText(item) {
+    if (!item.compressed) {
+        return item.text;
+    }
+    
+    const record = await imageDB.getText(item.textId);
+    if (!record) {
+        throw new Error('저장된 텍스트를 찾을 수 없습니다');
+    }
+    
+    return decompressText(record.data);
+}
+
 // Copy image to clipboard
 async function copyImageToClipboard(item) {
     try {
@@ -218,71 +283,98 @@ async function copyImageToClipboard(item) {
             throw new Error('이미지 데이터가 없습니다');
         }
         
-        if (!item.dataUrl) {
+        if (!item.imageId && !item.dataUrl) {
             throw new Error('이미지 데이터 URL이 없습니다');
         }
         
-        // Create image element to convert to PNG
-        const img = new Image();
-        
-        return new Promise((resolve, reject) => {
-            img.onload = async function() {
-                try {
-                    // Create canvas to convert image to PNG
-                    const canvas = document.createElement('canvas');
-                    const ctx = canvas.getContext('2d');
-                    
-                    canvas.width = img.naturalWidth;
-                    canvas.height = img.naturalHeight;
-                    
-                    // Draw image to canvas
-                    ctx.drawImage(img, 0, 0);
-                    
-                    // Convert canvas to blob (PNG format)
-                    canvas.toBlob(async (blob) => {
-                        try {
-                            if (!blob) {
-                                throw new Error('이미지를 PNG로 변환할 수 없습니다');
-                            }
-                            
-                            console.log('Converted image to PNG blob:', blob.type, blob.size);
-                            
-                            // Use Clipboard API with PNG blob
-                            const clipboardItem = new ClipboardItem({
-                                'image/png': blob
-                            });
-                            
-                            await navigator.clipboard.write([clipboardItem]);
-                            showNotification('이미지가 클립보드에 복사되었습니다!');
-                            console.log('Image successfully copied to clipboard as PNG');
-                            resolve();
-                        } catch (clipboardError) {
-                            console.error('Clipboard write error:', clipboardError);
-                            reject(clipboardError);
-                        }
-                    }, 'image/png');
-                } catch (canvasError) {
-                    console.error('Canvas conversion error:', canvasError);
-                    reject(canvasError);
-                }
-            };
-            
-            img.onerror = function() {
-                const error = new Error('이미지를 로드할 수 없습니다');
-                console.error('Image load error:', error);
-                reject(error);
-            };
-            
-            // Load the image
-            img.src = item.dataUrl;
+        // Passing a promise keeps the write inside the click's user activation
+        const clipboardItem = new ClipboardItem({
+            'image/png': getClipboardPngBlob(item)
         });
         
+        await navigator.clipboard.write([clipboardItem]);
+        showNotification('이미지가 클립보드에 복사되었습니다!');
+        console.log('Image successfully copied to clipboard as PNG');
+        
     } catch (error) {
         console.error('Error copying image to clipboard:', error);
         showNotification(`이미지 복사 실패: ${error.message}`, 'error');
     }
 }
 
+// Get the PNG pre-encoded at capture time, converting only for older items
+async function getClipboardPngBlob(item) {
+    if (item.imageId) {
+        try {
+            const blob = await imageDB.getClipboardBlob(item.imageId);
+            if (blob) {
+                console.log('Using stored clipboard PNG:', blob.size);
+                return blob;
+            }
+        } catch (dbError) {
+            console.error('Error reading clipboard PNG from IndexedDB:', dbError);
+        }
+    }
+    
+    if (!item.dataUrl) {
+        throw new Error('이미지 데이터 URL이 없습니다');
+    }
+    
+    const pngBlob = await convertImageToPng(item.dataUrl);
+    
+    // Imported images come without a clipboard PNG; keep this one for next time
+    if (item.imageId) {
+        imageDB.storeClipboardBlob(item.imageId, pngBlob).catch((dbError) => {
+            console.error('Error storing clipboard PNG:', dbError);
+        });
+    }
+    
+    return pngBlob;
+}
+
+// Convert an image data URL to a PNG blob via canvas
+function convertImageToPng(dataUrl) {
+    const img = new Image();
+    
+    return new Promise((resolve, reject) => {
+        img.onload = function() {
+            try {
+                // Create canvas to convert image to PNG
+                const canvas = document.createElement('canvas');
+                const ctx = canvas.getContext('2d');
+                
+                canvas.width = img.naturalWidth;
+                canvas.height = img.naturalHeight;
+                
+                // Draw image to canvas
+                ctx.drawImage(img, 0, 0);
+                
+                // Convert canvas to blob (PNG format)
+                canvas.toBlob((blob) => {
+                    if (!blob) {
+                        reject(new Error('이미지를 PNG로 변환할 수 없습니다'));
+                        return;
+                    }
+                    console.log('Converted image to PNG blob:', blob.type, blob.size);
+                    resolve(blob);
+                }, 'image/png');
+            } catch (canvasError) {
+                console.error('Canvas conversion error:', canvasError);
+                reject(canvasError);
+            }
+        };
+        
+        img.onerror = function() {
+            const error = new Error('이미지를 로드할 수 없습니다');
+            console.error('Image load error:', error);
+            reject(error);
+        };
+        
+        // Load the image
+        img.src = dataUrl;
+    });
+}
+
 // Delete a specific history item
 async function deleteHistoryItem(itemId) {
     try {
@@ -293,6 +385,12 @@ async function deleteHistoryItem(itemId) {
         
         await chrome.storage.local.set({ clipboardHistory: updatedHistory });
         
+        // Remove the compressed copy of a large text as well
+        const deletedItem = history.find(item => item.id === itemId);
+        if (deletedItem?.compressed) {
+            await imageDB.deleteTexts([deletedItem.textId]);
+        }
+        
         // UI will update automatically via storage change listener
     } catch (error) {
         console.error('Error deleting history item:', error);
@@ -328,8 +426,9 @@ async function clearAllHistory() {
     try {
         await chrome.storage.local.set({ clipboardHistory: [] });
         
-        // Also clear all images
+        // Also clear all images and compressed texts
         await chrome.runtime.sendMessage({ type: 'CLEAR_ALL_IMAGES' });
+        await imageDB.clearAllTexts();
         
         hideClearAllDialog();
         showNotification('모든 클립보드 히스토리가 삭제되었습니다');
@@ -339,6 +438,77 @@ async function clearAllHistory() {
     }
 }
 
+// Export history to a backup file
+async function exportHistory() {
+    const fileName = `sideclip-${new Date().toISOString().slice(0, 10)}.sideclip`;
+    exportBtn.disabled = true;
+    
+    try {
+        let writable;
+        if (window.showSaveFilePicker) {
+            const handle = await window.showSaveFilePicker({
+                suggestedName: fileName,
+                types: [{
+                    description: 'SideClip backup',
+                    accept: { [ARCHIVE_MIME_TYPE]: ['.sideclip'] }
+                }]
+            });
+            writable = await handle.createWritable();
+        } else {
+            writable = createDownloadStream(fileName);
+        }
+        
+        const count = await historyArchive.exportTo(writable);
+        showNotification(`${count}개 항목을 내보냈습니다`);
+    } catch (error) {
+        // The user closed the save dialog
+        if (error.name === 'AbortError') return;
+        console.error('Error exporting history:', error);
+        showNotification('내보내기 실패', 'error');
+    } finally {
+        exportBtn.disabled = false;
+    }
+}
+
+// Collect written chunks as blob parts and download them when the stream closes.
+// Unlike the file picker path, this keeps the whole archive in memory until then.
+function createDownloadStream(fileName) {
+    const parts = [];
+    
+    return new WritableStream({
+        write(chunk) {
+            parts.push(chunk);
+        },
+        close() {
+            const url = URL.createObjectURL(new Blob(parts, { type: ARCHIVE_MIME_TYPE }));
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = fileName;
+            link.click();
+            setTimeout(() => URL.revokeObjectURL(url), 10000);
+        }
+    });
+}
+
+// Import history from a backup file chosen by the user
+async function importHistory() {
+    const file = importInput.files[0];
+    if (!file) return;
+    
+    importBtn.disabled = true;
+    
+    try {
+        const count = await historyArchive.importFrom(file.stream());
+        showNotification(`${count}개 항목을 가져왔습니다`);
+    } catch (error) {
+        console.error('Error importing history:', error);
+        showNotification(`가져오기 실패: ${error.message}`, 'error');
+    } finally {
+        importInput.value = '';
+        importBtn.disabled = false;
+    }
+}
+
 // Show notification
 function showNotification(message, type = 'success') {
     const notificationText = notification.querySelector('.notification-text');
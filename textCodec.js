@@ -0,0 +1,25 @@
+// Compression helpers for large clipboard text entries
+const TEXT_COMPRESSION_FORMAT = 'deflate-raw';
+
+// Compress text into a binary blob
+async function compressText(text) {
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream(TEXT_COMPRESSION_FORMAT));
+  return new Response(stream).blob();
+}
+
+// Restore text from a blob produced by compressText
+async function decompressText(blob) {
+  const stream = blob.stream().pipeThrough(new DecompressionStream(TEXT_COMPRESSION_FORMAT));
+  return new Response(stream).text();
+}
+
+// SHA-256 of the text as hex, used to find duplicates without keeping the text
+async function hashText(text) {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Export for use in other files
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = { compressText, decompressText, hashText };
+}